@@ -1,45 +1,272 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+import asyncio
+import json
+import time
 
-from app.schemas.chat_schema import ChatRequest, ChatResponse
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.schemas.chat_schema import ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse, RetrievalFilters
 from app.services.monitoring_service import Monitoring
+from app.services.metrics import metrics
 from app.services.retrieval_service import RetrievalService
 from app.services.fusion import reciprocal_rank_fusion
 from app.services.reranker_service import RerankerService
 from app.services.llm_service import LLMService
 from app.services.guardrail_service import GuardrailService
+from app.services.cache_service import SemanticAnswerCache
+from app.services.query_router import QueryRouter, RetrievalPlan
+from app.services.context_compressor import ContextCompressor
 from app.core.config import settings
+from app.core.registry import registry
 
 router = APIRouter()
+# Mounted without the /api/v1 prefix so Prometheus can scrape /metrics
+metrics_router = APIRouter()
+
+# Dependency Generators (shared instances loaded once at startup)
+def _require_ready() -> None:
+    if registry.load_error is not None:
+        raise HTTPException(status_code=503, detail="Service failed to start.")
+    if not registry.is_ready:
+        raise HTTPException(status_code=503, detail="Service is warming up. Please retry shortly.")
 
-# Dependency Generators
 def get_retrieval_service() -> RetrievalService:
-    return RetrievalService()
+    _require_ready()
+    return registry.retriever
 
 def get_reranker_service() -> RerankerService:
-    return RerankerService()
+    _require_ready()
+    return registry.reranker
 
 def get_llm_service() -> LLMService:
-    return LLMService()
+    _require_ready()
+    return registry.llm
 
 def get_guardrail_service() -> GuardrailService:
-    return GuardrailService()
+    _require_ready()
+    return registry.guardrails
+
+def get_answer_cache() -> SemanticAnswerCache:
+    _require_ready()
+    return registry.answer_cache
+
+def get_query_router() -> QueryRouter:
+    _require_ready()
+    return registry.router
+
+def get_context_compressor() -> ContextCompressor:
+    _require_ready()
+    return registry.compressor
+
+@router.get("/ready")
+def readiness():
+    """Readiness probe: only reports ready once every model has been loaded and warmed up."""
+    if registry.load_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": registry.load_error})
+    if not registry.is_ready:
+        return JSONResponse(status_code=503, content={"status": "loading", "timings": registry.timings})
+    return {"status": "ready", "timings": registry.timings}
+
+@router.get("/stats")
+def runtime_stats():
+    """Runtime counters for the shared batching queues and caches."""
+    _require_ready()
+    return registry.stats()
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus exposition: stage latency histograms, request counters, cache hit rates and queue depths."""
+    samples: Dict[str, List[Tuple[Dict[str, str], float]]] = {
+        "rag_traces_total": [({"decision": k}, v) for k, v in Monitoring.get_tracer().decisions.items()],
+        "rag_queue_depth": [({"queue": "trace_export"}, Monitoring.get_tracer().exporter.queue_depth)],
+    }
+    if registry.is_ready:
+        stats = registry.stats()
+        for cache in ("embedding_cache", "bm25_cache", "rerank_score_cache", "answer_cache", "llm_response_cache"):
+            if not stats.get(cache):
+                continue
+            labels = {"cache": cache.removesuffix("_cache")}
+            samples.setdefault("rag_cache_hits_total", []).append((labels, stats[cache]["hits"]))
+            samples.setdefault("rag_cache_misses_total", []).append((labels, stats[cache]["misses"]))
+            samples.setdefault("rag_cache_hit_ratio", []).append((labels, stats[cache]["hit_rate"]))
+        samples["rag_queue_depth"] += [
+            ({"queue": "embedder_batcher"}, stats["embedder_batching"]["queue_depth"]),
+            ({"queue": "reranker_batcher"}, stats["reranker_batching"]["queue_depth"]),
+        ]
+        samples["rag_llm_in_flight"] = [({}, stats["llm_client"]["in_flight"])]
+    return PlainTextResponse(metrics.render(samples), media_type="text/plain; version=0.0.4")
+
+async def _run_blocking(fn, *args):
+    """Run a CPU-bound/blocking call on the shared bounded executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(registry.executor, fn, *args)
+
+def _active_filters(filters: Optional[RetrievalFilters]) -> Optional[Dict[str, Any]]:
+    """Request filters as a plain dict of the fields actually set (None when unfiltered)."""
+    if filters is None:
+        return None
+    return filters.model_dump(exclude_none=True) or None
+
+async def _search_dense(
+    query: str,
+    retriever: RetrievalService,
+    vector: Optional[List[float]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    top_k: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Encode through the shared embedding batcher (unless already encoded), then search the vector index."""
+    if vector is None:
+        with metrics.time("embed"):
+            vector = (await retriever.aembed_queries([query]))[0]
+    with metrics.time("dense"):
+        return await _run_blocking(retriever.search_vector_by_embedding, vector, filters, top_k)
+
+async def _search_sparse(
+    query: str,
+    retriever: RetrievalService,
+    filters: Optional[Dict[str, Any]] = None,
+    top_k: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    with metrics.time("sparse"):
+        return await _run_blocking(retriever.search_bm25, query, filters, top_k)
+
+async def _no_results() -> List[Dict[str, Any]]:
+    return []
+
+def _validate_input(guardrails: GuardrailService, query: str) -> bool:
+    with metrics.time("guardrail"):
+        return guardrails.validate_input(query)
+
+async def _lookup_answer_cache(
+    query: str, retriever: RetrievalService, answer_cache: SemanticAnswerCache
+) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+    """
+    Exact normalized-query match first, then embedding similarity.
+    Returns (cached_response, query_vector); the vector is reused for dense retrieval on a miss.
+    """
+    if not settings.answer_cache_enabled:
+        return None, None
+
+    cached = answer_cache.get_exact(query)
+    if cached is not None:
+        return cached, None
+
+    with metrics.time("embed"):
+        vector = (await retriever.aembed_queries([query]))[0]
+    return answer_cache.get_similar(vector), vector
+
+async def _retrieve_and_rerank(
+    query: str,
+    retriever: RetrievalService,
+    reranker: RerankerService,
+    tracer,
+    query_vector: Optional[List[float]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    plan: Optional[RetrievalPlan] = None,
+) -> List[Dict[str, Any]]:
+    """Run the planned retrieval paths, fusion and reranking inside the current trace."""
+    plan = plan or RetrievalPlan.hybrid()
+    with tracer.start_as_current_observation(
+        as_type="span",
+        name="retrieval",
+        input={"query": query, "filters": filters, "plan": plan.as_dict()},
+    ) as span:
+        with metrics.time("retrieval"):
+            # 3. Dense & Sparse Retrieval (run concurrently; the router may skip one), restricted to the filtered chunks
+            vector_results, bm25_results = await asyncio.gather(
+                _search_dense(query, retriever, query_vector, filters, plan.top_k_vector) if plan.use_dense else _no_results(),
+                _search_sparse(query, retriever, filters, plan.top_k_bm25) if plan.use_sparse else _no_results(),
+            )
+
+            # 4. Hybrid Fusion (RRF)
+            with metrics.time("fusion"):
+                hybrid_results = reciprocal_rank_fusion(vector_results, bm25_results, chunk_store=retriever.chunk_store, top_k=plan.top_k_fusion)
+        output = {"num_dense": len(vector_results), "num_sparse": len(bm25_results), "num_fused": len(hybrid_results)}
+        if filters:
+            output["filter"] = retriever.filter_selectivity(filters)
+        span.update(output=output)
+
+    with tracer.start_as_current_observation(
+        as_type="span",
+        name="reranking",
+        input={"num_docs": len(hybrid_results)},
+    ) as span:
+        # 5. Cross-Encoder Re-Ranking
+        with metrics.time("rerank"):
+            top_chunks = await reranker.ascore_and_rank(query, hybrid_results)
+        span.update(output={"num_top_chunks": len(top_chunks)})
+
+    return top_chunks
+
+async def _compress_context(
+    query: str,
+    top_chunks: List[Dict[str, Any]],
+    compressor: ContextCompressor,
+    tracer,
+    query_vector: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """Trim the reranked chunks to the prompt token budget (sources still come from the full chunks)."""
+    if not settings.context_compression:
+        return top_chunks
+    with tracer.start_as_current_observation(
+        as_type="span",
+        name="context_compression",
+        input={"num_chunks": len(top_chunks), "budget": compressor.token_budget},
+    ) as span:
+        with metrics.time("compression"):
+            context_chunks, stats = await _run_blocking(compressor.compress, query, top_chunks, query_vector)
+        span.update(output=stats)
+    return context_chunks
 
-@router.post("/chat", response_model=ChatResponse)
-def handle_chat_query(
+def _collect_sources(top_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    sources = []
+    for chunk in top_chunks:
+         keys = chunk.get("metadata", {})
+         sources.append({
+             "doc_id": str(keys.get("doc_id", "Unknown")),
+             "page": str(keys.get("page_number_range", "Unknown")),
+             "score": float(chunk.get("reranker_score", 0.0))
+         })
+    return sources
+
+def _server_timing(timings: Dict[str, float], start: float) -> Dict[str, float]:
+    """Stage milliseconds collected for this request plus the total so far."""
+    return {**{stage: round(ms, 2) for stage, ms in timings.items()}, "total": round((time.perf_counter() - start) * 1000, 2)}
+
+def _with_timings(response: ChatResponse, http_response: Response, timings: Dict[str, float], start: float) -> ChatResponse:
+    """Send the stage timings as a Server-Timing header, and in the body when debug_timings is on."""
+    stage_ms = _server_timing(timings, start)
+    http_response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in stage_ms.items())
+    if settings.debug_timings:
+        response = response.model_copy(update={"timings": stage_ms})
+    return response
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def handle_chat_query(
     req: ChatRequest,
+    http_response: Response,
     retriever: RetrievalService = Depends(get_retrieval_service),
     reranker: RerankerService = Depends(get_reranker_service),
     llm: LLMService = Depends(get_llm_service),
-    guardrails: GuardrailService = Depends(get_guardrail_service)
+    guardrails: GuardrailService = Depends(get_guardrail_service),
+    answer_cache: SemanticAnswerCache = Depends(get_answer_cache),
+    router: QueryRouter = Depends(get_query_router),
+    compressor: ContextCompressor = Depends(get_context_compressor)
 ):
+    start = time.perf_counter()
+    timings = metrics.collect_request_timings()
     logger = Monitoring.get_logger()
     logger.info(f"Received query from {req.user_id}: {req.query}")
 
     # 1. Monitoring Root Trace
-    langfuse = Monitoring.get_langfuse()
+    tracer = Monitoring.get_tracer()
     
-    with langfuse.start_as_current_observation(
+    with tracer.start_as_current_observation(
         as_type="span",
         name="banking-rag-query",
         input={"query": req.query},
@@ -47,39 +274,29 @@ def handle_chat_query(
         root_span.update_trace(user_id=req.user_id)
 
         # 2. Input Validation (Guardrails)
-        if not guardrails.validate_input(req.query):
+        if not _validate_input(guardrails, req.query):
             raise HTTPException(status_code=400, detail="Invalid Query. Blocked by security guardrails.")
 
-        with langfuse.start_as_current_observation(
-            as_type="span",
-            name="retrieval",
-            input={"query": req.query},
-        ) as span:
-            # 3. Dense & Sparse Retrieval
-            vector_results = retriever.search_vector(req.query)
-            bm25_results = retriever.search_bm25(req.query)
+        # Answer cache: near-identical questions skip retrieval, reranking and the LLM entirely.
+        # Cached answers are corpus-wide, so filtered requests bypass it.
+        filters = _active_filters(req.filters)
+        cached, query_vector = (None, None) if filters else await _lookup_answer_cache(req.query, retriever, answer_cache)
+        if cached is not None:
+            root_span.update(output={"final_answer": cached["answer"], "cache_hit": True})
+            return _with_timings(ChatResponse(**cached), http_response, timings, start)
 
-            # 4. Hybrid Fusion (RRF)
-            hybrid_results = reciprocal_rank_fusion(vector_results, bm25_results)
-            span.update(output={"num_dense": len(vector_results), "num_sparse": len(bm25_results), "num_fused": len(hybrid_results)})
-
-        with langfuse.start_as_current_observation(
-            as_type="span",
-            name="reranking",
-            input={"num_docs": len(hybrid_results)},
-        ) as span:
-            # 5. Cross-Encoder Re-Ranking
-            top_chunks = reranker.score_and_rank(req.query, hybrid_results)
-            span.update(output={"num_top_chunks": len(top_chunks)})
+        plan = router.plan(req.query)
+        root_span.update(metadata={"retrieval_plan": plan.mode})
+        top_chunks = await _retrieve_and_rerank(req.query, retriever, reranker, tracer, query_vector, filters, plan)
 
         if not top_chunks:
             answer = "I do not have enough context to answer that."
             root_span.update(output={"final_answer": answer})
-            return ChatResponse(
+            return _with_timings(ChatResponse(
                 answer=answer,
                 sources=[],
                 confidence=0.0
-            )
+            ), http_response, timings, start)
 
         # 6. Guardrails Output Validations
         avg_score = sum([c.get("reranker_score", 0.0) for c in top_chunks]) / len(top_chunks)
@@ -87,40 +304,257 @@ def handle_chat_query(
         
         if not valid:
              root_span.update(output={"final_answer": safe_eval, "rejected": True})
-             return ChatResponse(
+             return _with_timings(ChatResponse(
                 answer=safe_eval,
                 sources=[],
                 confidence=0.0
-            )
+            ), http_response, timings, start)
 
-        with langfuse.start_as_current_observation(
+        context_chunks = await _compress_context(req.query, top_chunks, compressor, tracer, query_vector)
+
+        with tracer.start_as_current_observation(
             as_type="generation",
             name="llm_call",
             model=settings.llm_model,
-            input={"query": req.query, "context_length": len(top_chunks)},
+            input={"query": req.query, "context_length": len(context_chunks)},
         ) as span:
             # 7. LLM Call
-            raw_answer = llm.generate_answer(req.query, top_chunks)
+            with metrics.time("llm"):
+                raw_answer = await llm.agenerate_answer(req.query, context_chunks)
             span.update(output={"answer_length": len(raw_answer)})
         
         # 8. Clean up outputs
-        valid, final_answer = guardrails.validate_output(answer=raw_answer, avg_reranker_score=avg_score)
+        with metrics.time("guardrail"):
+            valid, final_answer = guardrails.validate_output(answer=raw_answer, avg_reranker_score=avg_score)
         confidence = guardrails.calculate_confidence(top_chunks)
         
         # Collect sources
-        sources = []
-        for chunk in top_chunks:
-             keys = chunk.get("metadata", {})
-             sources.append({
-                 "doc_id": str(keys.get("doc_id", "Unknown")),
-                 "page": str(keys.get("page_number_range", "Unknown")),
-                 "score": float(chunk.get("reranker_score", 0.0))
-             })
+        sources = _collect_sources(top_chunks)
 
         root_span.update(output={"final_answer": final_answer, "confidence": confidence})
 
-        return ChatResponse(
+        response = ChatResponse(
             answer=final_answer,
             sources=sources,
             confidence=confidence
         )
+        if query_vector is not None:
+            answer_cache.set(req.query, query_vector, response.model_dump(exclude={"timings"}))
+        return _with_timings(response, http_response, timings, start)
+
+@router.post("/chat/stream")
+async def handle_chat_stream(
+    req: ChatRequest,
+    retriever: RetrievalService = Depends(get_retrieval_service),
+    reranker: RerankerService = Depends(get_reranker_service),
+    llm: LLMService = Depends(get_llm_service),
+    guardrails: GuardrailService = Depends(get_guardrail_service),
+    answer_cache: SemanticAnswerCache = Depends(get_answer_cache),
+    router: QueryRouter = Depends(get_query_router),
+    compressor: ContextCompressor = Depends(get_context_compressor)
+):
+    """
+    Server-Sent Events variant of /chat.
+    Emits `sources` (with confidence) as soon as reranking finishes, then `token` events
+    as the answer is generated (PII-masked incrementally), and a final `done` event.
+    """
+    logger = Monitoring.get_logger()
+    logger.info(f"Received streaming query from {req.user_id}: {req.query}")
+
+    start = time.perf_counter()
+    timings = metrics.collect_request_timings()
+    # Reject before the stream opens so clients still get a proper 400
+    if not _validate_input(guardrails, req.query):
+        raise HTTPException(status_code=400, detail="Invalid Query. Blocked by security guardrails.")
+
+    async def event_stream():
+        metrics.collect_request_timings(timings)  # the response may iterate this in another context
+        tracer = Monitoring.get_tracer()
+
+        with tracer.start_as_current_observation(
+            as_type="span",
+            name="banking-rag-query-stream",
+            input={"query": req.query},
+        ) as root_span:
+            root_span.update_trace(user_id=req.user_id)
+
+            filters = _active_filters(req.filters)
+            cached, query_vector = (None, None) if filters else await _lookup_answer_cache(req.query, retriever, answer_cache)
+            if cached is not None:
+                root_span.update(output={"final_answer": cached["answer"], "cache_hit": True})
+                yield _sse("sources", {"sources": cached["sources"], "confidence": cached["confidence"]})
+                yield _sse("token", {"text": cached["answer"]})
+                yield _sse("done", {})
+                return
+
+            plan = router.plan(req.query)
+            root_span.update(metadata={"retrieval_plan": plan.mode})
+            top_chunks = await _retrieve_and_rerank(req.query, retriever, reranker, tracer, query_vector, filters, plan)
+
+            if not top_chunks:
+                answer = "I do not have enough context to answer that."
+                root_span.update(output={"final_answer": answer})
+                yield _sse("sources", {"sources": [], "confidence": 0.0})
+                yield _sse("token", {"text": answer})
+                yield _sse("done", {})
+                return
+
+            avg_score = sum([c.get("reranker_score", 0.0) for c in top_chunks]) / len(top_chunks)
+            valid, safe_eval = guardrails.validate_output(answer="", avg_reranker_score=avg_score, threshold=settings.reranker_threshold)
+
+            if not valid:
+                root_span.update(output={"final_answer": safe_eval, "rejected": True})
+                yield _sse("sources", {"sources": [], "confidence": 0.0})
+                yield _sse("token", {"text": safe_eval})
+                yield _sse("done", {})
+                return
+
+            # Early delivery: sources and confidence before any generation happens
+            confidence = guardrails.calculate_confidence(top_chunks)
+            sources = _collect_sources(top_chunks)
+            yield _sse("sources", {"sources": sources, "confidence": confidence})
+
+            context_chunks = await _compress_context(req.query, top_chunks, compressor, tracer, query_vector)
+
+            with tracer.start_as_current_observation(
+                as_type="generation",
+                name="llm_call",
+                model=settings.llm_model,
+                input={"query": req.query, "context_length": len(context_chunks)},
+            ) as span:
+                masker = guardrails.stream_masker()
+                emitted: List[str] = []
+                llm_start = time.perf_counter()
+                ttft_ms: Optional[float] = None
+                async for delta in llm.astream_answer(req.query, context_chunks):
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - llm_start) * 1000
+                        metrics.observe_stage("llm_first_token", ttft_ms / 1000)
+                    safe_text = masker.feed(delta)
+                    if safe_text:
+                        emitted.append(safe_text)
+                        yield _sse("token", {"text": safe_text})
+                tail = masker.flush()
+                if tail:
+                    emitted.append(tail)
+                    yield _sse("token", {"text": tail})
+                final_answer = "".join(emitted)
+                metrics.observe_stage("llm", time.perf_counter() - llm_start)
+                span.update(output={"answer_length": len(final_answer), "ttft_ms": ttft_ms})
+
+            root_span.update(output={"streamed": True, "confidence": confidence})
+            if query_vector is not None:
+                answer_cache.set(req.query, query_vector, {"answer": final_answer, "sources": sources, "confidence": confidence})
+            # Headers are long gone once tokens flow, so stage timings ride on the final event instead
+            yield _sse("done", {"timings": _server_timing(timings, start)} if settings.debug_timings else {})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/chat/batch", response_model=BatchChatResponse, response_model_exclude_none=True)
+async def handle_chat_batch(
+    req: BatchChatRequest,
+    retriever: RetrievalService = Depends(get_retrieval_service),
+    reranker: RerankerService = Depends(get_reranker_service),
+    llm: LLMService = Depends(get_llm_service),
+    guardrails: GuardrailService = Depends(get_guardrail_service),
+    compressor: ContextCompressor = Depends(get_context_compressor)
+):
+    """
+    Answer N queries in one call for offline jobs (FAQ regeneration, evaluation).
+    Queries are embedded in one encode call, searched in Chroma with one query, BM25-searched
+    in parallel and reranked in one batched predict. Set `generate=false` to skip the LLM.
+    """
+    logger = Monitoring.get_logger()
+    logger.info(f"Received batch of {len(req.queries)} queries from {req.user_id}")
+
+    tracer = Monitoring.get_tracer()
+
+    with tracer.start_as_current_observation(
+        as_type="span",
+        name="banking-rag-batch",
+        input={"num_queries": len(req.queries), "generate": req.generate},
+    ) as root_span:
+        root_span.update_trace(user_id=req.user_id)
+
+        results: List[Optional[ChatResponse]] = [None] * len(req.queries)
+        valid_idx = []
+        for i, query in enumerate(req.queries):
+            if _validate_input(guardrails, query):
+                valid_idx.append(i)
+            else:
+                results[i] = ChatResponse(answer="Invalid Query. Blocked by security guardrails.", sources=[], confidence=0.0)
+        queries = [req.queries[i] for i in valid_idx]
+        filters = _active_filters(req.filters)
+
+        if queries:
+            with tracer.start_as_current_observation(
+                as_type="span",
+                name="retrieval",
+                input={"num_queries": len(queries), "filters": filters},
+            ) as span:
+                with metrics.time("embed"):
+                    vectors = await _run_blocking(retriever.embed_queries, queries)
+
+                async def _dense_batch() -> List[List[Dict[str, Any]]]:
+                    with metrics.time("dense"):
+                        return await _run_blocking(retriever.search_vector_batch, vectors, filters)
+
+                vector_batches, *bm25_batches = await asyncio.gather(
+                    _dense_batch(),
+                    *[_search_sparse(q, retriever, filters) for q in queries],
+                )
+                with metrics.time("fusion"):
+                    hybrid_batches = [reciprocal_rank_fusion(v, b, chunk_store=retriever.chunk_store) for v, b in zip(vector_batches, bm25_batches)]
+                output = {"num_fused": sum(len(h) for h in hybrid_batches)}
+                if filters:
+                    output["filter"] = retriever.filter_selectivity(filters)
+                span.update(output=output)
+
+            with tracer.start_as_current_observation(
+                as_type="span",
+                name="reranking",
+                input={"num_pairs": sum(len(h) for h in hybrid_batches)},
+            ) as span:
+                with metrics.time("rerank"):
+                    top_chunk_batches = await _run_blocking(reranker.score_and_rank_batch, queries, hybrid_batches)
+                span.update(output={"num_top_chunks": sum(len(t) for t in top_chunk_batches)})
+
+            async def _answer(query: str, top_chunks: List[Dict[str, Any]], vector: List[float]) -> ChatResponse:
+                if not top_chunks:
+                    return ChatResponse(answer="I do not have enough context to answer that.", sources=[], confidence=0.0)
+
+                avg_score = sum([c.get("reranker_score", 0.0) for c in top_chunks]) / len(top_chunks)
+                valid, safe_eval = guardrails.validate_output(answer="", avg_reranker_score=avg_score, threshold=settings.reranker_threshold)
+                if not valid:
+                    return ChatResponse(answer=safe_eval, sources=[], confidence=0.0)
+
+                final_answer = ""
+                if req.generate:
+                    context_chunks = top_chunks
+                    if settings.context_compression:
+                        with metrics.time("compression"):
+                            context_chunks, _ = await _run_blocking(compressor.compress, query, top_chunks, vector)
+                    with metrics.time("llm"):
+                        raw_answer = await llm.agenerate_answer(query, context_chunks)
+                    _, final_answer = guardrails.validate_output(answer=raw_answer, avg_reranker_score=avg_score)
+                return ChatResponse(
+                    answer=final_answer,
+                    sources=_collect_sources(top_chunks),
+                    confidence=guardrails.calculate_confidence(top_chunks)
+                )
+
+            with tracer.start_as_current_observation(
+                as_type="generation" if req.generate else "span",
+                name="llm_batch" if req.generate else "answer_assembly",
+                input={"num_queries": len(queries)},
+            ):
+                answers = await asyncio.gather(*[_answer(q, t, v) for q, t, v in zip(queries, top_chunk_batches, vectors)])
+            for i, answer in zip(valid_idx, answers):
+                results[i] = answer
+
+        root_span.update(output={"num_results": len(results), "num_blocked": len(req.queries) - len(queries)})
+        return BatchChatResponse(results=results)
@@ -1,13 +1,24 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     # Vector DB
     chroma_persist_dir: str = "data/chroma_db"
     chroma_collection: str = "bank_documents"
     
+    # Chunk Store (id -> text/metadata, written at ingestion)
+    chunk_store_dir: str = "data/chunk_store"
+    
+    # Dense Backend: "chroma" (HNSW via Chroma) or "mmap" (exact search over a memory-mapped matrix)
+    dense_backend: str = "chroma"
+    dense_index_dir: str = "data/dense_index"
+    dense_index_dtype: str = "float32"  # or "float16" to halve memory
+    
     # BM25 Index
-    whoosh_index_dir: str = "data/whoosh_index"
+    bm25_index_dir: str = "data/bm25_index"
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
     
     # Raw and Processed Data Paths
     data_dir: str = "data/raw"
@@ -18,9 +29,46 @@ class Settings(BaseSettings):
     llm_model: str = "openai/gpt-oss-120b"
     temperature: float = 0.2
     
+    # LLM Client: one pooled client per process (see app/services/llm_client.py)
+    groq_base_url: Optional[str] = None  # e.g. "http://127.0.0.1:8900" for benchmarks/stub_llm_server.py
+    llm_max_concurrency: int = 16  # upstream calls in flight, async (API) and blocking (scripts) combined
+    llm_pool_connections: int = 32
+    llm_connect_timeout_seconds: float = 5.0
+    llm_read_timeout_seconds: float = 30.0
+    llm_deadline_seconds: float = 45.0  # per call across retries; for streams, until the stream opens
+    llm_max_retries: int = 2
+    llm_retry_base_delay_ms: float = 200.0
+    llm_retry_max_delay_ms: float = 2000.0
+    llm_hedge_enabled: bool = False  # send a second request once the first outlives the recent p95
+    llm_hedge_min_delay_ms: float = 300.0
+    llm_hedge_min_samples: int = 20
+    
+    # Context Compression: pack the best sentences / table rows of the reranked chunks under a token budget
+    context_compression: bool = False
+    context_token_budget: int = 1200  # tiktoken cl100k_base tokens of chunk text in the prompt
+    
+    # LLM Response Cache (SQLite, keyed by prompt + chunk ids + model + temperature + index version)
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "data/cache/llm_responses.sqlite"
+    llm_cache_max_mb: float = 64.0
+    llm_cache_max_age_seconds: float = 7 * 24 * 3600.0
+    
     # Reranking
     reranker_model: str = "BAAI/bge-reranker-base"
     reranker_threshold: float = -2.0
+    rerank_max_batch_size: int = 64
+    rerank_max_wait_ms: float = 5.0
+    rerank_cache_max_entries: int = 50000
+    rerank_cache_path: Optional[str] = None  # e.g. "data/cache/rerank_scores.sqlite" to persist scores
+    rerank_token_dir: str = "data/chunk_store/rerank_tokens"  # chunk token ids for reranker_model
+    
+    # Cascaded Reranking: "single" sends every fused candidate to reranker_model,
+    # "cascade" prunes them with a cheap first stage and only reranks the survivors
+    reranker_mode: str = "single"
+    cascade_first_stage: str = "cross-encoder"  # or "dense" (embedding cosine similarity)
+    cascade_first_stage_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    cascade_first_stage_keep: int = 8  # candidates passed on to reranker_model
+    cascade_early_exit_margin: float = 0.25  # share of the first-stage score range; see RerankerService._cascade_select
     
     # Retrieval
     top_k_vector: int = 10
@@ -28,14 +76,55 @@ class Settings(BaseSettings):
     top_k_fusion: int = 15
     top_k_rerank: int = 5
     
+    # Query Routing: "off" always runs hybrid retrieval; "heuristic" picks dense / sparse / hybrid per query
+    query_router: str = "off"
+    router_single_path_depth: int = 8  # candidates fetched (and reranked) by a single-path plan
+    
+    # Query Caches
+    embedding_cache_max_entries: int = 10000
+    bm25_cache_max_entries: int = 10000
+    
+    # Answer Cache
+    answer_cache_enabled: bool = True
+    answer_cache_max_entries: int = 1000
+    answer_cache_ttl_seconds: float = 3600.0
+    answer_cache_similarity_threshold: float = 0.95
+    
+    # Concurrency
+    retrieval_workers: int = 8
+    batch_max_queries: int = 64  # /chat/batch requests with more queries are rejected (422)
+    
     # Embedding Model
     embedding_model: str = "all-MiniLM-L6-v2"
+    embed_max_batch_size: int = 64
+    embed_max_wait_ms: float = 2.0
+    
+    # Inference Backend for the embedder and cross-encoders (serving and ingestion):
+    # "torch" (PyTorch fp32), "onnx" (ONNX Runtime fp32) or "onnx-int8" (dynamic int8 quantization)
+    inference_backend: str = "torch"
+    onnx_cache_dir: str = "data/onnx_models"
+    onnx_quantization_config: str = "avx2"  # "arm64", "avx2", "avx512" or "avx512_vnni"
+    
+    # Guardrails: extra blocked input phrases, one per line (added to the built-in list)
+    guardrail_blocklist_path: Optional[str] = None
     
     # Langfuse
     langfuse_public_key: str = ""
     langfuse_secret_key: str = ""
     langfuse_host: str = "https://cloud.langfuse.com"
     
+    # Trace Sampling: failed and slow requests are always exported, the rest at trace_sample_rate
+    trace_sample_rate: float = 1.0
+    trace_slow_request_ms: float = 3000.0
+    trace_export_queue_size: int = 1000  # kept traces waiting for the background exporter; extras are dropped
+    
+    # Startup: load and warm up models on a background thread so the port binds at once
+    # (requests get 503 until GET /api/v1/ready reports ready); false loads before serving
+    startup_background_load: bool = True
+    
+    # Per-stage timings: always sent as a Server-Timing header; also in the response body when enabled
+    debug_timings: bool = False
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
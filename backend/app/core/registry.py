@@ -0,0 +1,139 @@
+"""
+Process-wide Service Registry
+Loads models, indexes and clients once at application startup and shares them across requests.
+The service modules import their heavy dependencies (torch, sentence-transformers, chromadb, groq,
+tiktoken) when `load()` constructs them, so the app can bind its port before any of them are imported.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.services.monitoring_service import Monitoring
+from app.services.retrieval_service import FILTER_FIELDS, RetrievalService
+from app.services.fusion import reciprocal_rank_fusion
+from app.services.reranker_service import RerankerService
+from app.services.llm_service import LLMService
+from app.services.guardrail_service import GuardrailService
+from app.services.cache_service import SemanticAnswerCache
+from app.services.query_router import QueryRouter
+from app.services.context_compressor import ContextCompressor
+
+logger = Monitoring.get_logger()
+
+WARMUP_QUERY = "What is the minimum balance for a savings account?"
+
+
+class ServiceRegistry:
+    """Holds the shared service instances and tracks warmup/readiness state."""
+
+    def __init__(self):
+        self.retriever: Optional[RetrievalService] = None
+        self.reranker: Optional[RerankerService] = None
+        self.llm: Optional[LLMService] = None
+        self.guardrails: Optional[GuardrailService] = None
+        self.router: Optional[QueryRouter] = None
+        self.compressor: Optional[ContextCompressor] = None
+        self.answer_cache = SemanticAnswerCache(
+            max_entries=settings.answer_cache_max_entries,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+        )
+        # Bounded pool for blocking retrieval/reranking work off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=settings.retrieval_workers, thread_name_prefix="rag-worker")
+        self.timings: Dict[str, float] = {}
+        self.load_error: Optional[str] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def load(self) -> None:
+        """Construct every service once, then warm them up. Safe to call repeatedly."""
+        with self._lock:
+            if self.is_ready:
+                return
+
+            start = time.perf_counter()
+            self.retriever = RetrievalService()
+            self.router = QueryRouter(self.retriever.bm25)
+            self.compressor = ContextCompressor(self.retriever.embedding_model)
+            self.timings["load_retriever"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            # A "dense" cascade first stage reuses the retriever's embedding model; a stale
+            # reranker token store is rebuilt from the retriever's chunk store
+            self.reranker = RerankerService(
+                embedding_model=self.retriever.embedding_model,
+                chunk_store=self.retriever.chunk_store,
+            )
+            self.timings["load_reranker"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.llm = LLMService()
+            self.guardrails = GuardrailService()
+            self.timings["load_llm"] = time.perf_counter() - start
+
+            self.warmup()
+            self._ready.set()
+            logger.info(f"Service registry ready: { {k: round(v, 3) for k, v in self.timings.items()} }")
+
+    def load_in_background(self) -> None:
+        """Run `load()` on a daemon thread; a failure is logged and kept in `load_error` for /ready."""
+        def run() -> None:
+            start = time.perf_counter()
+            try:
+                self.load()
+            except Exception as e:
+                self.load_error = f"{type(e).__name__}: {e}"
+                logger.exception("Service registry failed to load")
+                return
+            self.timings["startup_total"] = time.perf_counter() - start
+
+        threading.Thread(target=run, name="registry-loader", daemon=True).start()
+
+    def warmup(self) -> None:
+        """Run one inference through each local model so the first real request pays no lazy-init cost."""
+        start = time.perf_counter()
+        vector_results = self.retriever.search_vector(WARMUP_QUERY)
+        bm25_results = self.retriever.search_bm25(WARMUP_QUERY)
+        hybrid_results = reciprocal_rank_fusion(vector_results, bm25_results, chunk_store=self.retriever.chunk_store)
+        # Metadata value -> rows index used by filtered requests (one scan of the chunk store)
+        self.retriever.chunk_store.build_field_index(FILTER_FIELDS)
+        self.timings["warmup_retrieval"] = time.perf_counter() - start
+
+        # The Groq LLM is a remote call; we only construct its client and do not spend a completion on warmup.
+        start = time.perf_counter()
+        warmup_docs = hybrid_results[:1] or [{"id": "warmup", "text": WARMUP_QUERY, "metadata": {}}]
+        self.reranker.score_and_rank(WARMUP_QUERY, warmup_docs)
+        self.timings["warmup_reranker"] = time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of runtime counters from the shared services."""
+        return {
+            "embedder_batching": {**self.retriever.embed_batcher.stats.snapshot(), "queue_depth": self.retriever.embed_batcher.queue_depth},
+            "reranker_batching": {**self.reranker.batcher.stats.snapshot(), "queue_depth": self.reranker.batcher.queue_depth},
+            "embedding_cache": self.retriever.embedding_cache.stats(),
+            "bm25_cache": self.retriever.bm25_cache.stats(),
+            "rerank_score_cache": self.reranker.score_cache.stats(),
+            "reranker_cascade": {"mode": self.reranker.mode, **self.reranker.cascade_stats},
+            "answer_cache": self.answer_cache.stats(),
+            "llm_response_cache": self.llm.response_cache.stats() if self.llm.response_cache else None,
+            "llm_client": self.llm.client.stats.snapshot(),
+            "tracing": Monitoring.get_tracer().stats(),
+        }
+
+    def shutdown(self) -> None:
+        """Flush pending telemetry and stop the worker pools before the process exits."""
+        Monitoring.flush()
+        if self.retriever is not None:
+            self.retriever.embed_batcher.shutdown()
+        if self.reranker is not None:
+            self.reranker.batcher.shutdown()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+registry = ServiceRegistry()
@@ -0,0 +1,112 @@
+"""
+Startup Profiling
+`python -m app.main --profile-startup` shows where cold start time goes. A fresh interpreter runs
+with `-X importtime`, imports the app (what has to happen before the port binds), then runs
+`registry.load()` (model loading and warmup, in the background when serving). For each phase it
+reports import time per top-level package (self time summed over its modules) and the slowest
+third-party imports made directly by app code or at runtime (cumulative, with the importing
+module), followed by the registry's own load / warmup timings.
+"""
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+_LOAD_MARKER = "startup-profile: registry load"
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+from app.core.registry import registry
+timings = {"import_app": time.perf_counter() - start}
+if LOAD:
+    print(MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    registry.load()
+    timings["registry_load"] = time.perf_counter() - start
+    timings.update(("registry." + k, v) for k, v in registry.timings.items())
+    registry.shutdown()
+print(json.dumps(timings))
+"""
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    importer: str  # enclosing import, "" when imported from running code
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(lines: List[str]) -> List[ImportRecord]:
+    """
+    `import time:   123 |   4567 |   pkg.mod` lines. Nesting is shown as 2 spaces per level and a
+    module is printed after everything it imports, so the importer is found walking backwards.
+    """
+    parsed = []
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_field, cumulative_field, name_field = line[len("import time:"):].split("|", 2)
+        name = name_field[1:].rstrip()
+        parsed.append((name.strip(), (len(name) - len(name.lstrip())) // 2, int(self_field), int(cumulative_field)))
+
+    records = []
+    open_imports: Dict[int, str] = {}
+    for module, depth, self_us, cumulative_us in reversed(parsed):
+        open_imports[depth] = module
+        records.append(ImportRecord(module, open_imports.get(depth - 1, "") if depth else "", self_us, cumulative_us))
+    records.reverse()
+    return records
+
+
+def _is_app(module: str) -> bool:
+    return module == "app" or module.startswith("app.")
+
+
+def summarize(records: List[ImportRecord], top: int) -> Dict[str, object]:
+    by_package: Dict[str, int] = defaultdict(int)
+    for record in records:
+        by_package[record.module.split(".")[0]] += record.self_us
+    # Where a dependency enters: imported by an app module, or from code running inside load()
+    entry_points = [r for r in records if not _is_app(r.module) and (not r.importer or _is_app(r.importer))]
+    entry_points.sort(key=lambda r: r.cumulative_us, reverse=True)
+    return {
+        "total_ms": sum(r.self_us for r in records) / 1000,
+        "modules": len(records),
+        "packages": sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top],
+        "entry_points": [(r.module, r.importer or "-", r.cumulative_us) for r in entry_points[:top]],
+    }
+
+
+def _print_phase(title: str, summary: Dict[str, object]) -> None:
+    print(f"\n{title}: {summary['total_ms']:.0f} ms importing {summary['modules']} modules")
+    print("  by package (self time):")
+    for package, us in summary["packages"]:
+        print(f"    {us / 1000:>9.1f} ms  {package}")
+    print("  slowest dependency imports (cumulative, imported by):")
+    for module, importer, us in summary["entry_points"]:
+        print(f"    {us / 1000:>9.1f} ms  {module:<40} {importer}")
+
+
+def profile_startup(load: bool = True, top: int = 15) -> int:
+    """Profile a cold start in a subprocess and print the report; returns the child's exit code."""
+    code = _CHILD.replace("LOAD", repr(load)).replace("MARKER", repr(_LOAD_MARKER))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    stderr = result.stderr.splitlines()
+    if result.returncode != 0:
+        print("\n".join(line for line in stderr if not line.startswith("import time:"))[-4000:], file=sys.stderr)
+        print(f"Startup failed (exit code {result.returncode})", file=sys.stderr)
+        return result.returncode
+
+    split = stderr.index(_LOAD_MARKER) if _LOAD_MARKER in stderr else len(stderr)
+    _print_phase("Import app (before the port binds)", summarize(parse_importtime(stderr[:split]), top))
+    if load:
+        _print_phase("Registry load (imports made while loading services)", summarize(parse_importtime(stderr[split:]), top))
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    print("\nWall time:")
+    for name, seconds in timings.items():
+        print(f"    {seconds * 1000:>9.1f} ms  {name}")
+    return 0
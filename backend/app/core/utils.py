@@ -0,0 +1,50 @@
+"""
+Shared helpers for query normalization and ingestion index versioning.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Tuple
+
+from app.core.config import settings
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[\s?.!]+$")
+
+# (path, mtime_ns) -> version, so hot-path lookups only cost a stat()
+_version_cache: Tuple[str, int, str] = ("", -1, "")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation so trivially different queries match."""
+    query = _WHITESPACE.sub(" ", query.strip().lower())
+    return _TRAILING_PUNCT.sub("", query)
+
+
+def index_version_path() -> Path:
+    """Location of the marker the ingestion pipeline writes after storing a new collection."""
+    return Path(settings.chroma_persist_dir) / "index_version.json"
+
+
+def read_index_version() -> str:
+    """Return the current ingestion index version ("unversioned" if ingestion never wrote one)."""
+    global _version_cache
+    path = index_version_path()
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return "unversioned"
+
+    cached_path, cached_mtime, cached_version = _version_cache
+    if cached_path == str(path) and cached_mtime == mtime_ns:
+        return cached_version
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            version = str(json.load(f).get("version", "unversioned"))
+    except (OSError, ValueError):
+        return "unversioned"
+
+    _version_cache = (str(path), mtime_ns, version)
+    return version
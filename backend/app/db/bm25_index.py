@@ -0,0 +1,172 @@
+"""
+In-Memory BM25 Index
+Vectorized Okapi BM25 over a term -> postings (CSR) matrix built from the Chroma documents.
+Persisted as plain .npy arrays so it can be memory-mapped and shared between workers; a rebuild
+publishes a new version of the directory instead of overwriting arrays other workers have mapped.
+"""
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.versioned_dir import live_dir, publish
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Same stop list and minimum token length as Whoosh's StandardAnalyzer, so recall stays comparable
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "have", "if", "in",
+    "is", "it", "may", "not", "of", "on", "or", "tbd", "that", "the", "this", "to", "us", "we",
+    "when", "will", "with", "yet", "you", "your",
+))
+
+# Filters matching at least 1/ratio of the corpus are scored by a full scatter, then gathered
+_DENSE_FILTER_RATIO = 32
+
+_META_FILE = "meta.json"
+_ARRAY_FILES = ("indptr", "postings", "weights")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words or single characters."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if len(t) >= 2 and t not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Postings are stored term-major: the documents containing term `t` are
+    `postings[indptr[t]:indptr[t + 1]]` with precomputed BM25 term weights in `weights`.
+    A query is scored by scattering the postings of its terms into a dense score vector.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        weights: np.ndarray,
+        version: str = "",
+    ):
+        self.ids = ids
+        self.vocab = vocab
+        self.indptr = indptr
+        self.postings = postings
+        self.weights = weights
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: List[str], texts: Iterable[str], k1: float = 1.2, b: float = 0.75, version: str = "") -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_lengths = np.zeros(len(ids), dtype=np.float32)
+
+        for doc_idx, text in enumerate(texts):
+            tokens = tokenize(text or "")
+            doc_lengths[doc_idx] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_idx)
+                tfs.append(tf)
+
+        term_arr = np.asarray(term_ids, dtype=np.int64)
+        doc_arr = np.asarray(doc_ids, dtype=np.int32)
+        tf_arr = np.asarray(tfs, dtype=np.float32)
+
+        # Group postings by term (stable, so doc order is kept within a term)
+        order = np.argsort(term_arr, kind="stable")
+        term_arr, doc_arr, tf_arr = term_arr[order], doc_arr[order], tf_arr[order]
+        doc_freq = np.bincount(term_arr, minlength=len(vocab))
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=indptr[1:])
+        df = doc_freq.astype(np.float32)
+
+        n_docs = max(len(ids), 1)
+        avgdl = float(doc_lengths.mean()) if len(ids) else 1.0
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1.0 - b + b * doc_lengths[doc_arr] / (avgdl or 1.0))
+        weights = (idf[term_arr] * tf_arr * (k1 + 1.0) / (tf_arr + norm)).astype(np.float32)
+
+        return cls(list(ids), vocab, indptr, doc_arr, weights, version=version)
+
+    def search(self, query: str, top_k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Return (doc index, score) for the best `top_k` documents, highest score first.
+        With `rows` (sorted doc indices, e.g. a metadata filter) only those documents are scored.
+        """
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or not len(self.ids):
+            return []
+        if rows is not None and len(rows) * _DENSE_FILTER_RATIO < len(self.ids):
+            return self._search_rows(term_ids, top_k, rows)
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for t in term_ids:
+            start, end = self.indptr[t], self.indptr[t + 1]
+            # doc indices are unique within one term's postings, so fancy-index += is exact
+            scores[self.postings[start:end]] += self.weights[start:end]
+        if rows is not None:
+            # Broad filter: one scatter over the full postings beats intersecting them
+            return [(int(rows[i]), score) for i, score in self._top_k(scores[rows], top_k)]
+        return self._top_k(scores, top_k)
+
+    def _search_rows(self, term_ids: Iterable[int], top_k: int, rows: np.ndarray) -> List[Tuple[int, float]]:
+        """
+        Score only `rows`. A term's postings are sorted by doc index, so each term intersects them
+        with `rows` by binary search from whichever side is shorter: the work grows with
+        min(len(rows), doc frequency) per term, never with the corpus size.
+        """
+        if not len(rows):
+            return []
+        scores = np.zeros(len(rows), dtype=np.float32)
+        for t in term_ids:
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs = self.postings[start:end]
+            if len(rows) < len(docs):
+                pos = np.minimum(np.searchsorted(docs, rows), len(docs) - 1)
+                hit = docs[pos] == rows
+                scores[hit] += self.weights[start:end][pos[hit]]
+            else:
+                pos = np.minimum(np.searchsorted(rows, docs), len(rows) - 1)
+                hit = rows[pos] == docs
+                scores[pos[hit]] += self.weights[start:end][hit]
+        return [(int(rows[i]), score) for i, score in self._top_k(scores, top_k)]
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def save(self, directory: Path) -> None:
+        with publish(directory) as staging:
+            np.save(staging / "indptr.npy", self.indptr)
+            np.save(staging / "postings.npy", self.postings)
+            np.save(staging / "weights.npy", self.weights)
+            with open(staging / _META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "ids": self.ids, "vocab": self.vocab}, f, ensure_ascii=False)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = live_dir(directory)
+        return (directory / _META_FILE).exists() and all((directory / f"{name}.npy").exists() for name in _ARRAY_FILES)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "BM25Index":
+        directory = live_dir(directory)
+        mmap_mode = "r" if mmap else None
+        with open(directory / _META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAY_FILES}
+        return cls(meta["ids"], meta["vocab"], arrays["indptr"], arrays["postings"], arrays["weights"], version=meta.get("version", ""))
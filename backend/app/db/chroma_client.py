@@ -1,20 +1,25 @@
 """
 Chroma Vector Database Client Wrapper
 Singleton to prevent loading instances redundantly cross-app.
+chromadb is imported on first use, so importing this module stays cheap.
 """
-from chromadb import PersistentClient
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from app.core.config import settings
 from app.services.monitoring_service import Monitoring
 
+if TYPE_CHECKING:
+    from chromadb import PersistentClient
+
 logger = Monitoring.get_logger()
 
 class ChromaClientWrapper:
-    _instance: Optional[PersistentClient] = None
+    _instance: Optional["PersistentClient"] = None
     
     @classmethod
-    def get_client(cls) -> PersistentClient:
+    def get_client(cls) -> "PersistentClient":
         if cls._instance is None:
+            from chromadb import PersistentClient
+
             logger.info(f"Initializing ChromaDB Client Wrapper at {settings.chroma_persist_dir}")
             cls._instance = PersistentClient(path=settings.chroma_persist_dir)
         return cls._instance
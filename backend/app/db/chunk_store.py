@@ -0,0 +1,133 @@
+"""
+Chunk Store
+Compact, memory-mapped id -> {text, metadata} store written at ingestion time.
+Retrievers return only ids and scores; fusion hydrates the survivors from here in bulk.
+"""
+import json
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.db.versioned_dir import live_dir, publish
+
+_META_FILE = "meta.json"
+_RECORDS_FILE = "records.bin"
+_OFFSETS_FILE = "offsets.npy"
+
+
+class ChunkStore:
+    """
+    Records are UTF-8 JSON blobs concatenated in `records.bin`; record `i` spans
+    `offsets[i]:offsets[i + 1]`. Only the offsets and the id -> row map live on the heap.
+    """
+
+    def __init__(self, ids: List[str], offsets: np.ndarray, records: Any, version: str = ""):
+        self.ids = ids
+        self.offsets = offsets
+        self.version = version
+        self._records = records
+        self._row = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._field_index: Dict[str, Dict[Any, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._row
+
+    def row_of(self, chunk_id: str) -> Optional[int]:
+        return self._row.get(chunk_id)
+
+    def get_row(self, row: int) -> Dict[str, Any]:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(bytes(self._records[start:end]).decode("utf-8"))
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        row = self._row.get(chunk_id)
+        return self.get_row(row) if row is not None else None
+
+    def get_many(self, chunk_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [self.get(chunk_id) for chunk_id in chunk_ids]
+
+    def iter_texts(self) -> Iterator[str]:
+        for row in range(len(self.ids)):
+            yield self.get_row(row)["text"]
+
+    def build_field_index(self, fields: Iterable[str]) -> None:
+        """Index metadata value -> rows for `fields` in one scan of the records."""
+        fields = [field for field in fields if field not in self._field_index]
+        if not fields:
+            return
+        rows: Dict[str, Dict[Any, List[int]]] = {field: {} for field in fields}
+        for row in range(len(self.ids)):
+            metadata = self.get_row(row)["metadata"]
+            for field in fields:
+                value = metadata.get(field)
+                if value is not None:
+                    rows[field].setdefault(value, []).append(row)
+        for field, values in rows.items():
+            self._field_index[field] = {value: np.asarray(r, dtype=np.int64) for value, r in values.items()}
+
+    def filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask of chunks whose metadata matches every filter (a list value matches any item)."""
+        self.build_field_index(filters)
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, wanted in filters.items():
+            field_mask = np.zeros(len(self.ids), dtype=bool)
+            for value in wanted if isinstance(wanted, (list, tuple, set)) else [wanted]:
+                rows = self._field_index[field].get(value)
+                if rows is not None:
+                    field_mask[rows] = True
+            mask &= field_mask
+        return mask
+
+    def hydrate(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill `text` and `metadata` on id-only results in place; ids missing from the store are dropped."""
+        hydrated = []
+        for item in results:
+            record = self.get(item["id"])
+            if record is None:
+                continue
+            item["text"] = record["text"]
+            item["metadata"] = record["metadata"]
+            hydrated.append(item)
+        return hydrated
+
+    @staticmethod
+    def write(
+        directory: Path,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        version: str = "",
+    ) -> None:
+        """Write a new version of the store; servers that have the current one open keep reading it."""
+        with publish(directory) as staging:
+            offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+            with open(staging / _RECORDS_FILE, "wb") as f:
+                for row, (text, metadata) in enumerate(zip(texts, metadatas)):
+                    blob = json.dumps({"text": text, "metadata": metadata or {}}, ensure_ascii=False).encode("utf-8")
+                    f.write(blob)
+                    offsets[row + 1] = offsets[row] + len(blob)
+            np.save(staging / _OFFSETS_FILE, offsets)
+            with open(staging / _META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "ids": list(ids)}, f, ensure_ascii=False)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = live_dir(directory)
+        return all((directory / name).exists() for name in (_META_FILE, _RECORDS_FILE, _OFFSETS_FILE))
+
+    @classmethod
+    def open(cls, directory: Path) -> "ChunkStore":
+        directory = live_dir(directory)
+        with open(directory / _META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        offsets = np.load(directory / _OFFSETS_FILE, mmap_mode="r")
+        records: Any = b""
+        if (directory / _RECORDS_FILE).stat().st_size > 0:
+            with open(directory / _RECORDS_FILE, "rb") as f:
+                records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(meta["ids"], offsets, records, version=meta.get("version", ""))
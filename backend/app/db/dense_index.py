@@ -0,0 +1,101 @@
+"""
+Exact Dense Index
+Brute-force cosine search over a memory-mapped matrix of normalized chunk embeddings.
+For corpora of our size a single matmul + argpartition beats an HNSW round trip through Chroma,
+and because the matrix is a read-only mmap every uvicorn worker shares one copy of the vectors.
+A re-export therefore publishes a new version of the directory rather than overwriting the matrix.
+"""
+import json
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.versioned_dir import live_dir, publish
+
+_META_FILE = "meta.json"
+_MATRIX_FILE = "embeddings.npy"
+
+# Rows scored per matmul; bounds the float32 working set when the matrix is stored as float16
+_BLOCK_ROWS = 65536
+
+
+class ExactDenseIndex:
+    def __init__(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        version: str = "",
+    ):
+        self.ids = ids
+        self.matrix = matrix
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(
+        cls,
+        ids: List[str],
+        embeddings: Any,
+        dtype: str = "float32",
+        version: str = "",
+    ) -> "ExactDenseIndex":
+        if not len(ids):
+            return cls([], np.zeros((0, 0), dtype=np.dtype(dtype)), version=version)
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = (matrix / np.where(norms == 0, 1.0, norms)).astype(np.dtype(dtype))
+        return cls(list(ids), matrix, version=version)
+
+    def search(self, queries: Any, top_k: int, rows: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Return (row index, cosine similarity) for the `top_k` nearest rows of each query.
+        With `rows` (e.g. a metadata filter) only those rows are read and scored.
+        """
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(q, axis=1, keepdims=True)
+        q = q / np.where(norms == 0, 1.0, norms)
+        n_candidates = len(self.ids) if rows is None else len(rows)
+        k = min(top_k, n_candidates)
+        if k == 0:
+            return [[] for _ in range(len(q))]
+
+        if rows is None and self.matrix.dtype == np.float32 and n_candidates <= _BLOCK_ROWS:
+            sims = q @ self.matrix.T
+        else:
+            sims = np.empty((len(q), n_candidates), dtype=np.float32)
+            for start in range(0, n_candidates, _BLOCK_ROWS):
+                block = self.matrix[start:start + _BLOCK_ROWS] if rows is None else self.matrix[rows[start:start + _BLOCK_ROWS]]
+                block = np.asarray(block, dtype=np.float32)
+                sims[:, start:start + len(block)] = q @ block.T
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-sims[row, candidates], kind="stable")]
+            if rows is None:
+                results.append([(int(i), float(sims[row, i])) for i in ordered])
+            else:
+                results.append([(int(rows[i]), float(sims[row, i])) for i in ordered])
+        return results
+
+    def save(self, directory: Path) -> None:
+        with publish(directory) as staging:
+            np.save(staging / _MATRIX_FILE, self.matrix)
+            with open(staging / _META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "ids": self.ids}, f, ensure_ascii=False)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = live_dir(directory)
+        return (directory / _META_FILE).exists() and (directory / _MATRIX_FILE).exists()
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "ExactDenseIndex":
+        directory = live_dir(directory)
+        with open(directory / _META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(directory / _MATRIX_FILE, mmap_mode="r" if mmap else None)
+        return cls(meta["ids"], matrix, version=meta.get("version", ""))
@@ -0,0 +1,89 @@
+"""
+Token Store
+Reranker token ids for every chunk, written at ingestion time so serving only tokenizes the query.
+Ids are stored without special tokens and capped at the reranker's max length; pair building
+(special tokens + longest-first truncation) happens per request in RerankerService.
+"""
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+
+from app.db.versioned_dir import live_dir, publish
+
+_META_FILE = "meta.json"
+_TOKENS_FILE = "tokens.npy"
+_OFFSETS_FILE = "offsets.npy"
+
+# Texts per tokenizer call while building
+_BUILD_BATCH = 256
+
+
+class TokenStore:
+    """
+    Token ids of chunk `i` are `tokens[offsets[i]:offsets[i + 1]]` (CSR layout, int32, memory-mapped).
+    `tokenizer_name` records which tokenizer produced them; ids from another tokenizer are useless.
+    """
+
+    def __init__(self, ids: List[str], offsets: np.ndarray, tokens: np.ndarray, tokenizer_name: str = "", version: str = ""):
+        self.ids = ids
+        self.offsets = offsets
+        self.tokens = tokens
+        self.tokenizer_name = tokenizer_name
+        self.version = version
+        self._row = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, chunk_id: Optional[str]) -> Optional[List[int]]:
+        row = self._row.get(chunk_id)
+        if row is None:
+            return None
+        return self.tokens[self.offsets[row]:self.offsets[row + 1]].tolist()
+
+    @staticmethod
+    def write(
+        directory: Path,
+        ids: List[str],
+        texts: Iterable[str],
+        tokenizer: Any,
+        tokenizer_name: str,
+        max_length: int = 512,
+        version: str = "",
+    ) -> None:
+        """Tokenize `texts` with a Hugging Face tokenizer and publish the ids as a new store version."""
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        parts: List[np.ndarray] = []
+        texts = iter(texts)
+        row = 0
+        while batch := list(islice(texts, _BUILD_BATCH)):
+            encoded = tokenizer(batch, add_special_tokens=False, truncation=True, max_length=max_length)["input_ids"]
+            for token_ids in encoded:
+                parts.append(np.asarray(token_ids, dtype=np.int32))
+                offsets[row + 1] = offsets[row] + len(token_ids)
+                row += 1
+
+        tokens = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+        # Rerankers may have the current tokens.npy / offsets.npy mapped; never overwrite them
+        with publish(directory) as staging:
+            np.save(staging / _TOKENS_FILE, tokens)
+            np.save(staging / _OFFSETS_FILE, offsets)
+            with open(staging / _META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "tokenizer": tokenizer_name, "ids": list(ids)}, f, ensure_ascii=False)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = live_dir(directory)
+        return all((directory / name).exists() for name in (_META_FILE, _TOKENS_FILE, _OFFSETS_FILE))
+
+    @classmethod
+    def open(cls, directory: Path) -> "TokenStore":
+        directory = live_dir(directory)
+        with open(directory / _META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        offsets = np.load(directory / _OFFSETS_FILE, mmap_mode="r")
+        tokens = np.load(directory / _TOKENS_FILE, mmap_mode="r")
+        return cls(meta["ids"], offsets, tokens, tokenizer_name=meta.get("tokenizer", ""), version=meta.get("version", ""))
@@ -0,0 +1,59 @@
+"""
+Versioned Store Directories
+Serving memory-maps the persisted stores and indexes, so a rebuild must never truncate or rewrite
+a file another process may have mapped (readers would see torn records, or SIGBUS on a shrunk file).
+Each write goes into a fresh `v-*` subdirectory that is renamed into place and published by
+atomically replacing the `CURRENT` pointer file. Readers resolve the pointer once when opening and
+keep their mapping of the old files; older versions beyond the previous one are pruned (unlinking
+a mapped file leaves existing mappings valid on POSIX).
+Directories written before this layout (files directly in the directory) are still readable.
+"""
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+_POINTER_FILE = "CURRENT"
+_VERSION_PREFIX = "v-"
+
+
+def _current_name(directory: Path) -> Optional[str]:
+    try:
+        name = (directory / _POINTER_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return name or None
+
+
+def live_dir(directory: Path) -> Path:
+    """Directory holding the currently published files of the store at `directory`."""
+    directory = Path(directory)
+    name = _current_name(directory)
+    return directory / name if name else directory
+
+
+@contextmanager
+def publish(directory: Path) -> Iterator[Path]:
+    """Yield an empty staging directory; on success it becomes the live version of `directory`."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{_VERSION_PREFIX}{time.time_ns()}-{os.getpid()}"
+    staging = directory / f".{name}.tmp"
+    staging.mkdir()
+    try:
+        yield staging
+        previous = _current_name(directory)
+        staging.rename(directory / name)
+        pointer_tmp = directory / f".{_POINTER_FILE}.{name}.tmp"
+        pointer_tmp.write_text(name, encoding="utf-8")
+        os.replace(pointer_tmp, directory / _POINTER_FILE)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # The previous version may still be being opened by a reader that resolved the old pointer
+    for child in directory.iterdir():
+        if child.is_dir() and child.name.startswith(_VERSION_PREFIX) and child.name not in (name, previous):
+            shutil.rmtree(child, ignore_errors=True)
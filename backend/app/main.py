@@ -2,16 +2,31 @@
 FastAPI Server Core Application.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import router as api_router
+from app.api.routes import metrics_router, router as api_router
 from app.core.config import settings
+from app.core.registry import registry
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm up all models/indexes once, shared by every request. In the background the
+    # port binds immediately and routes answer 503 until the registry is ready.
+    if settings.startup_background_load:
+        registry.load_in_background()
+    else:
+        registry.load()
+    yield
+    registry.shutdown()
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Banking RAG API",
         description="Hybrid Online Query Layer for Banking Domain RAG",
         version="1.0.0",
+        lifespan=lifespan,
     )
     
     app.add_middleware(
@@ -20,19 +35,27 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing"],  # readable by the frontend for per-stage latency
     )
     
     app.include_router(api_router, prefix="/api/v1")
+    app.include_router(metrics_router)
     return app
 
 app = create_app()
 
-@app.on_event("shutdown")
-def shutdown():
-    from langfuse import get_client
-    langfuse = get_client()
-    langfuse.flush()
-
 if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Banking RAG API server")
+    parser.add_argument("--profile-startup", action="store_true", help="Report import and init time per module, then exit")
+    parser.add_argument("--skip-load", action="store_true", help="With --profile-startup: profile the app import only")
+    args = parser.parse_args()
+    if args.profile_startup:
+        from app.core.startup_profile import profile_startup
+
+        sys.exit(profile_startup(load=not args.skip_load))
+
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
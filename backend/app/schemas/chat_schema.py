@@ -1,9 +1,18 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+class RetrievalFilters(BaseModel):
+    """Only chunks whose metadata matches every given field are retrieved; a list matches any of its values."""
+    doc_id: Optional[List[str]] = None
+    file_name: Optional[List[str]] = None
+    document_type: Optional[List[str]] = None
+    contains_table: Optional[bool] = None
 
 class ChatRequest(BaseModel):
     user_id: str
     query: str
+    filters: Optional[RetrievalFilters] = None
 
 class SourceMetadata(BaseModel):
     doc_id: str
@@ -14,3 +23,14 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[SourceMetadata]
     confidence: float
+    timings: Optional[Dict[str, float]] = None  # per-stage milliseconds, only with DEBUG_TIMINGS=true
+
+class BatchChatRequest(BaseModel):
+    user_id: str
+    # One batch is reranked in a single blocking predict on the shared executor, so its size is capped
+    queries: List[str] = Field(max_length=settings.batch_max_queries)
+    generate: bool = True  # False returns retrieval/reranking results only (no LLM call)
+    filters: Optional[RetrievalFilters] = None  # applied to every query in the batch
+
+class BatchChatResponse(BaseModel):
+    results: List[ChatResponse]
@@ -0,0 +1,148 @@
+"""
+Dynamic Micro-Batching
+Coalesces work items submitted by concurrent requests into a single batched model call.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.monitoring_service import Monitoring
+
+logger = Monitoring.get_logger()
+
+
+@dataclass
+class _PendingRequest:
+    items: List[Any]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchStats:
+    """Running counters for batch sizes and queue wait times."""
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+        self.max_batch_size = 0
+        self.queue_ms_total = 0.0
+        self.queue_ms_max = 0.0
+
+    def record(self, batch_size: int, queue_times_ms: List[float]) -> None:
+        self.batches += 1
+        self.items += batch_size
+        self.requests += len(queue_times_ms)
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.queue_ms_total += sum(queue_times_ms)
+        self.queue_ms_max = max(self.queue_ms_max, max(queue_times_ms))
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_ms": self.queue_ms_total / self.requests if self.requests else 0.0,
+            "max_queue_ms": self.queue_ms_max,
+        }
+
+
+class MicroBatcher:
+    """
+    Shared queue in front of a batched function `process_fn(items) -> results` (one result per item).
+
+    A batch is flushed when it holds `max_batch_size` items or `max_wait_ms` after its first
+    request arrived, whichever comes first. Each request gets back exactly the results for the
+    items it submitted. The model call runs on a dedicated thread so the event loop stays free.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        self.name = name
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = BatchStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-batcher")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, items: List[Any]) -> List[Any]:
+        """Enqueue items from one request and wait for their results."""
+        if not items:
+            return []
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingRequest(items=list(items), future=future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _collect(self) -> List[_PendingRequest]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0].items)
+        deadline = loop.time() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            items = [item for request in batch for item in request.items]
+
+            try:
+                results = await loop.run_in_executor(self._executor, self.process_fn, items)
+            except Exception as e:
+                logger.error(f"[{self.name}] batch of {len(items)} failed: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                n = len(request.items)
+                if not request.future.done():
+                    request.future.set_result(list(results[offset:offset + n]))
+                offset += n
+
+            queue_times_ms = [(started - request.enqueued_at) * 1000 for request in batch]
+            self.stats.record(len(items), queue_times_ms)
+            logger.debug(
+                f"[{self.name}] batch={len(items)} requests={len(batch)} "
+                f"queue_ms_max={max(queue_times_ms):.1f} run_ms={(time.perf_counter() - started) * 1000:.1f}"
+            )
+
+    def shutdown(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
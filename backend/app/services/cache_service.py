@@ -0,0 +1,356 @@
+"""
+In-Memory Caches
+Bounded LRU/TTL cache, the semantic answer cache used in front of the RAG pipeline,
+the reranker score cache (memory with optional SQLite spill) and the SQLite LLM response cache.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.utils import normalize_query, read_index_version
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Live value for `key`; `count=False` leaves the hit/miss counters to the caller."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                stored_at, value = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._data.move_to_end(key)
+                    self.hits += count
+                    return value
+                del self._data[key]
+            self.misses += count
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def touch(self, key: Hashable) -> None:
+        """Mark an entry as recently used without counting a hit."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Live (non-expired) entries, oldest first. Does not touch recency or counters."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value) for key, (stored_at, value) in self._data.items()
+                if self.ttl_seconds is None or now - stored_at <= self.ttl_seconds
+            ]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SemanticAnswerCache:
+    """
+    Caches final chat answers.
+    Lookup is an exact match on the normalized query first, then cosine similarity of the
+    query embedding against cached queries above `similarity_threshold`.
+    The whole cache is dropped whenever ingestion publishes a new index version.
+    A lookup is counted once: `get_exact` counts its hits, and `get_similar` (called after an
+    exact miss) counts the hit or the miss for the lookup as a whole.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0
+        self._entries = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._version = read_index_version()
+        self._lock = threading.Lock()
+
+    def _check_version(self) -> None:
+        version = read_index_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self._version = version
+
+    def get_exact(self, query: str) -> Optional[Dict[str, Any]]:
+        self._check_version()
+        entry = self._entries.get(normalize_query(query), count=False)
+        if entry is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry["response"]
+
+    def get_similar(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Best cached answer whose query embedding clears the similarity threshold."""
+        self._check_version()
+        entries = self._entries.items()
+        if not entries:
+            self._count_miss()
+            return None
+
+        query_vec = np.asarray(embedding, dtype=np.float32)
+        query_vec /= np.linalg.norm(query_vec) or 1.0
+        matrix = np.stack([entry["embedding"] for _, entry in entries])
+        similarities = matrix @ query_vec
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            self._count_miss()
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.semantic_hits += 1
+        key, entry = entries[best]
+        self._entries.touch(key)
+        return entry["response"]
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def set(self, query: str, embedding: List[float], response: Dict[str, Any]) -> None:
+        self._check_version()
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        self._entries.set(normalize_query(query), {"embedding": vector, "response": response})
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "semantic_hits": self.semantic_hits,
+            "index_version": self._version,
+        }
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class RerankScoreCache:
+    """
+    Cross-encoder scores keyed by (reranker model, query hash, chunk id).
+    Each entry also stores a hash of the chunk text it was scored against, so a chunk whose
+    contents changed under the same id is treated as a miss and its stale score is dropped.
+    Entries live in an in-memory LRU and, when `disk_path` is set, spill to SQLite.
+    """
+
+    def __init__(self, model_name: str, max_entries: int, disk_path: Optional[str] = None):
+        self.model_name = model_name
+        self._memory = LRUCache(max_entries=max_entries)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rerank_scores (key TEXT PRIMARY KEY, text_hash TEXT NOT NULL, score REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._db is not None
+
+    def _key(self, query_hash: str, chunk_id: str) -> str:
+        return f"{self.model_name}|{query_hash}|{chunk_id}"
+
+    def get_many(self, query: str, documents: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """Cached score per document (None on miss or when the chunk text changed)."""
+        query_hash = _sha1(query.strip())
+        keys = [self._key(query_hash, str(doc["id"])) for doc in documents]
+        text_hashes = [_sha1(doc["text"]) for doc in documents]
+        entries = [self._memory.get(key) for key in keys]
+
+        disk_lookups = [i for i, entry in enumerate(entries) if entry is None]
+        if disk_lookups and self._db is not None:
+            with self._db_lock:
+                placeholders = ",".join("?" * len(disk_lookups))
+                rows = self._db.execute(
+                    f"SELECT key, text_hash, score FROM rerank_scores WHERE key IN ({placeholders})",
+                    [keys[i] for i in disk_lookups],
+                ).fetchall()
+            found = {key: (text_hash, score) for key, text_hash, score in rows}
+            for i in disk_lookups:
+                if keys[i] in found:
+                    entries[i] = found[keys[i]]
+                    self._memory.set(keys[i], entries[i])
+
+        scores: List[Optional[float]] = []
+        stale: List[str] = []
+        for key, text_hash, entry in zip(keys, text_hashes, entries):
+            if entry is not None and entry[0] == text_hash:
+                scores.append(entry[1])
+                continue
+            if entry is not None:
+                stale.append(key)
+            scores.append(None)
+
+        if stale:
+            self._evict(stale)
+        return scores
+
+    def set_many(self, query: str, documents: List[Dict[str, Any]], scores: List[float]) -> None:
+        query_hash = _sha1(query.strip())
+        rows = []
+        for doc, score in zip(documents, scores):
+            key = self._key(query_hash, str(doc["id"]))
+            entry = (_sha1(doc["text"]), float(score))
+            self._memory.set(key, entry)
+            rows.append((key, entry[0], entry[1]))
+
+        if self._db is not None and rows:
+            with self._db_lock:
+                self._db.executemany("INSERT OR REPLACE INTO rerank_scores VALUES (?, ?, ?)", rows)
+                self._db.commit()
+
+    def _evict(self, keys: List[str]) -> None:
+        for key in keys:
+            self._memory.pop(key)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM rerank_scores WHERE key = ?", [(key,) for key in keys])
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._memory.stats(), "disk": self.on_disk}
+
+
+class LLMResponseCache:
+    """
+    Disk-backed (SQLite) cache of generated answers keyed by a content hash of the full prompt,
+    the context chunk ids, model, temperature and index version.
+    Entries older than `max_age_seconds` are misses; when the stored text exceeds `max_bytes`
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_age_seconds: float):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(
+        messages: List[Dict[str, str]],
+        chunk_ids: List[str],
+        model: str,
+        temperature: float,
+        index_version: Optional[str] = None,
+    ) -> str:
+        payload = {
+            "messages": messages,
+            "chunk_ids": chunk_ids,
+            "model": model,
+            "temperature": temperature,
+            "index_version": index_version if index_version is not None else read_index_version(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.max_age_seconds:
+                self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)", (key, response, size, now, now))
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until the cache fits in `max_bytes`."""
+        self._db.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.max_age_seconds,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._db.execute("SELECT key, size FROM llm_responses ORDER BY last_used ASC"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM llm_responses WHERE key = ?", stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
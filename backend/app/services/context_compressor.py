@@ -0,0 +1,159 @@
+"""
+Context Compression
+Shrinks the reranked chunks to a token budget before they go into the LLM prompt.
+Chunks are split into sentences and table lines ("Table N: ..." headers and "Row N: ..." rows,
+which are never split). Each unit is scored against the query with the embedding model, and the best
+units are packed greedily under the tiktoken budget. A kept row brings its table header along.
+"""
+import functools
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+_TABLE_HEADER = re.compile(r"^Table\s*\d+\s*:")
+_TABLE_ROW = re.compile(r"^Row\s*\d+\s*:")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"“(*•●-])")
+
+# Fragments shorter than this (list numbers, "etc.") are merged into a neighbouring sentence
+_MIN_SENTENCE_WORDS = 4
+
+@functools.lru_cache(maxsize=1)
+def _tokenizer():
+    """Same tokenizer the ingestion chunker sizes chunks with (loaded on first use)."""
+    import tiktoken
+
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(_tokenizer().encode(text))
+
+
+@dataclass
+class _Unit:
+    chunk: int
+    position: int
+    text: str
+    tokens: int
+    header: Optional[int] = None  # index of the owning table header unit, for rows
+    is_line: bool = False  # table lines are rejoined with newlines, sentences with spaces
+
+
+def split_units(text: str) -> List[Tuple[str, str]]:
+    """(kind, text) units of one chunk; kind is "header", "row" or "sentence"."""
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _TABLE_HEADER.match(line):
+            units.append(("header", line))
+        elif _TABLE_ROW.match(line):
+            units.append(("row", line))
+        else:
+            pending = ""
+            for sentence in _SENTENCE_END.split(line):
+                sentence = f"{pending} {sentence.strip()}".strip()
+                if len(sentence.split()) < _MIN_SENTENCE_WORDS:
+                    pending = sentence
+                    continue
+                units.append(("sentence", sentence))
+                pending = ""
+            if pending:
+                if units and units[-1][0] == "sentence":
+                    units[-1] = ("sentence", f"{units[-1][1]} {pending}")
+                else:
+                    units.append(("sentence", pending))
+    return units
+
+
+class ContextCompressor:
+    def __init__(self, embedding_model: Any, token_budget: Optional[int] = None):
+        self.embedding_model = embedding_model
+        self.token_budget = token_budget or settings.context_token_budget
+        if settings.context_compression:
+            # Load the encoding with the service rather than on the first request. With compression
+            # off it is never needed (and may not be downloadable), so it stays lazy
+            _tokenizer()
+
+    def _units(self, chunks: List[Dict[str, Any]]) -> List[_Unit]:
+        units: List[_Unit] = []
+        for chunk_idx, chunk in enumerate(chunks):
+            header: Optional[int] = None
+            for position, (kind, text) in enumerate(split_units(chunk.get("text", ""))):
+                if kind == "header":
+                    header = len(units)
+                elif kind == "sentence":
+                    header = None
+                units.append(_Unit(
+                    chunk=chunk_idx,
+                    position=position,
+                    text=text,
+                    tokens=count_tokens(text),
+                    header=header if kind == "row" else None,
+                    is_line=kind != "sentence",
+                ))
+        return units
+
+    def compress(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        query_vector: Optional[List[float]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return (compressed chunks in rerank order, stats); chunks left with no units are dropped."""
+        tokens_before = sum(count_tokens(c.get("text", "")) for c in chunks)
+        stats: Dict[str, Any] = {"tokens_before": tokens_before, "tokens_after": tokens_before, "budget": self.token_budget}
+        if tokens_before <= self.token_budget:
+            return chunks, stats
+
+        units = self._units(chunks)
+        texts = [u.text for u in units]
+        if query_vector is None:
+            texts = [query] + texts
+        vectors = np.asarray(self.embedding_model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+        if query_vector is None:
+            q, unit_vectors = vectors[0], vectors[1:]
+        else:
+            q = np.asarray(query_vector, dtype=np.float32)
+            q, unit_vectors = q / (np.linalg.norm(q) or 1.0), vectors
+        scores = unit_vectors @ q
+
+        # Greedy by similarity (ties go to the higher-ranked chunk); rows pay for their header once
+        kept = set()
+        used = 0
+        for i in sorted(range(len(units)), key=lambda i: (-scores[i], units[i].chunk, units[i].position)):
+            if i in kept:
+                continue
+            needed = [i]
+            if units[i].header is not None and units[i].header not in kept:
+                needed.append(units[i].header)
+            cost = sum(units[j].tokens for j in needed)
+            if used + cost > self.token_budget:
+                continue
+            kept.update(needed)
+            used += cost
+
+        compressed = []
+        for chunk_idx, chunk in enumerate(chunks):
+            parts = [u for j, u in enumerate(units) if u.chunk == chunk_idx and j in kept]
+            if not parts:
+                continue
+            text = ""
+            for prev, unit in zip([None] + parts[:-1], parts):
+                if prev is not None:
+                    text += "\n" if unit.is_line or prev.is_line else " "
+                text += unit.text
+            compressed.append({**chunk, "text": text})
+
+        stats.update({
+            "tokens_after": sum(count_tokens(c["text"]) for c in compressed),
+            "units_kept": len(kept),
+            "units_total": len(units),
+            "chunks_kept": len(compressed),
+        })
+        return compressed, stats
@@ -1,11 +1,22 @@
 """
 RRF (Reciprocal Rank Fusion) Logic for combining Hybrid Search
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.core.config import settings
+from app.db.chunk_store import ChunkStore
 
-def reciprocal_rank_fusion(vector_results: List[Dict], bm25_results: List[Dict], k: int = 60) -> List[Dict]:
-    """Merge Vector and BM25 results using Reciprocal Rank Fusion."""
+def reciprocal_rank_fusion(
+    vector_results: List[Dict],
+    bm25_results: List[Dict],
+    k: int = 60,
+    chunk_store: Optional[ChunkStore] = None,
+    top_k: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Merge Vector and BM25 results using Reciprocal Rank Fusion.
+    Retrievers may return id-only hits; the fused Top K is then hydrated with text and
+    metadata from `chunk_store` in one pass, so BM25-only hits get full metadata too.
+    """
     fused_scores = {}
     docs = {}
     
@@ -22,13 +33,14 @@ def reciprocal_rank_fusion(vector_results: List[Dict], bm25_results: List[Dict],
         doc_id = item["id"]
         if doc_id not in fused_scores:
             fused_scores[doc_id] = 0.0
-            # If a doc was only found in BM25, we enrich missing chroma metadata
-            # For simplicity, we only carry over what we have
-            docs[doc_id] = {"id": doc_id, "text": item["text"], "metadata": {}}
+            docs[doc_id] = {"id": doc_id, "text": item.get("text", ""), "metadata": item.get("metadata", {})}
         fused_scores[doc_id] += 1.0 / (k + rank + 1)
         
     # Sort descending
     sorted_docs = sorted(docs.values(), key=lambda doc: fused_scores[doc["id"]], reverse=True)
     
     # Return Top K Hybrid Fusion
-    return sorted_docs[:settings.top_k_fusion]
+    top_docs = sorted_docs[:top_k or settings.top_k_fusion]
+    if chunk_store is not None:
+        top_docs = chunk_store.hydrate(top_docs)
+    return top_docs
@@ -1,32 +1,166 @@
 """
 Guardrails and Confidence Scoring
+All input blocklist phrases and output PII patterns are compiled once into regexes: the blocklist
+becomes a single trie-shaped alternation (shared prefixes are tested once per position) combined
+with the PII patterns, so an input is checked in one pass however many phrases are configured.
 """
-from typing import List, Dict, Any, Tuple
+from pathlib import Path
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 import re
 
+from app.core.config import settings
+
+DEFAULT_BLOCKLIST = ("ignore previous instructions", "forget context", "hack", "system prompt")
+
+# (name, pattern, mask). Masks keep the shape of what they replace, so the longest mask is also
+# the longest possible match and bounds how much streamed text may be held back.
+PII_PATTERNS = (
+    ("card", r"\b\d{4}-\d{4}-\d{4}-\d{4}\b", "XXXX-XXXX-XXXX-XXXX"),  # 16-digit card numbers
+    ("ssn", r"\b\d{3}-\d{2}-\d{4}\b", "XXX-XX-XXXX"),
+)
+
+# Every character a PII match can contain; only a trailing run of these can still grow into a match
+_PII_CHARS = r"[\d-]"
+
+
+def _trie_regex(phrases: Iterable[str]) -> str:
+    """Regex source matching any of `phrases`, nested along their common prefixes."""
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+def load_blocklist(path: Optional[str] = None) -> List[str]:
+    """Default phrases plus one phrase per line from `path` (blank lines and # comments skipped)."""
+    phrases = list(DEFAULT_BLOCKLIST)
+    path = path or settings.guardrail_blocklist_path
+    if path and Path(path).exists():
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                phrases.append(line)
+    return phrases
+
+
+class GuardrailEngine:
+    """Compiled blocklist + PII patterns; built once at startup and shared by every request."""
+
+    def __init__(self, blocklist: Iterable[str], pii_patterns: Tuple[Tuple[str, str, str], ...] = PII_PATTERNS):
+        phrases = sorted({p.strip().lower() for p in blocklist if p.strip()})
+        self.phrase_count = len(phrases)
+        self.masks = {name: mask for name, _, mask in pii_patterns}
+        pii = "|".join(f"(?P<{name}>{pattern})" for name, pattern, _ in pii_patterns)
+        self.pii_pattern = re.compile(pii)
+        # Blocked phrases and PII in one alternation: one left-to-right scan finds both
+        scan = f"(?P<blocked>{_trie_regex(phrases)})|{pii}" if phrases else pii
+        self.scan_pattern = re.compile(scan, re.IGNORECASE)
+        self.holdback = max(len(mask) for mask in self.masks.values()) - 1
+        self.pii_tail = re.compile(f"{_PII_CHARS}+$")
+
+    def scan(self, text: str) -> List[Tuple[str, int, int]]:
+        """(kind, start, end) of every blocked phrase ("blocked") and PII match in `text`."""
+        return [(m.lastgroup, m.start(), m.end()) for m in self.scan_pattern.finditer(text)]
+
+    def is_blocked(self, text: str) -> bool:
+        return any(m.lastgroup == "blocked" for m in self.scan_pattern.finditer(text))
+
+    def mask(self, text: str) -> str:
+        return self.pii_pattern.sub(lambda m: self.masks[m.lastgroup], text)
+
+
+class StreamMasker:
+    """
+    Incrementally masks PII over a stream of text deltas.
+    Holds back only a trailing run of characters that could still be (part of) a match.
+    """
+
+    def __init__(self, engine: GuardrailEngine):
+        self.engine = engine
+        self._pending = ""
+        self._context = ""  # last emitted char, needed for the leading \b
+
+    def feed(self, text: str) -> str:
+        """Add a delta and return the portion that is now safe to emit."""
+        self._pending += text
+        return self._drain(final=False)
+
+    def flush(self) -> str:
+        """Return everything still held back (end of stream)."""
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> str:
+        window = self._context + self._pending
+        offset = len(self._context)
+        cut = len(window)
+        if not final:
+            # A match can only start inside the trailing run of PII characters, at most `holdback` long
+            tail = self.engine.pii_tail.search(window, max(offset, len(window) - self.engine.holdback))
+            if tail:
+                cut = tail.start()
+
+        # Searching from `offset` lets \b see the context char without matching inside it
+        matches = list(self.engine.pii_pattern.finditer(window, offset))
+
+        # Never cut through a match, or its tail would leak unmasked. A match touching the end
+        # of the window is not confirmed yet (the next char may break \b), so hold it back whole.
+        for match in matches:
+            if match.start() < cut < match.end():
+                cut = match.end() if match.end() < len(window) else match.start()
+
+        if cut <= offset:
+            return ""
+
+        parts: List[str] = []
+        pos = offset
+        for match in matches:
+            if match.end() > cut:
+                break
+            parts.append(window[pos:match.start()])
+            parts.append(self.engine.masks[match.lastgroup])
+            pos = match.end()
+        parts.append(window[pos:cut])
+
+        self._pending = window[cut:]
+        self._context = window[cut - 1]
+        return "".join(parts)
+
+
 class GuardrailService:
-    @staticmethod
-    def validate_input(query: str) -> bool:
-        """Simple prompt injection/bad word check."""
-        bad_words = ["ignore previous instructions", "forget context", "hack", "system prompt"]
-        query_lower = query.lower()
-        for word in bad_words:
-            if word in query_lower:
-                return False
-        return True
+    def __init__(self, engine: Optional[GuardrailEngine] = None):
+        self.engine = engine or GuardrailEngine(load_blocklist())
+
+    def validate_input(self, query: str) -> bool:
+        """Prompt injection / bad phrase check (case-insensitive substring match, one pass)."""
+        return not self.engine.is_blocked(query)
         
-    @staticmethod
-    def _mask_numbers(text: str) -> str:
+    def _mask_numbers(self, text: str) -> str:
         """Mask potential PII numbers like SSN or CCs."""
-        return re.sub(r'\b\d{4}-\d{4}-\d{4}-\d{4}\b', 'XXXX-XXXX-XXXX-XXXX', text)
+        return self.engine.mask(text)
+
+    def stream_masker(self) -> StreamMasker:
+        """Create a masker that applies the same PII masking to streamed output."""
+        return StreamMasker(self.engine)
     
-    @staticmethod
-    def validate_output(answer: str, avg_reranker_score: float, threshold: float = -5.0) -> Tuple[bool, str]:
+    def validate_output(self, answer: str, avg_reranker_score: float, threshold: float = -5.0) -> Tuple[bool, str]:
         """Guard against hallucinations and PII in output."""
         if avg_reranker_score < threshold:
             return False, "I'm sorry, I could not find highly confident information for your request."
         
-        masked_answer = GuardrailService._mask_numbers(answer)
+        masked_answer = self._mask_numbers(answer)
         return True, masked_answer
 
     @staticmethod
@@ -0,0 +1,354 @@
+"""
+LLM Client
+One pooled Groq client pair shared by every LLMService instance, with per-call deadlines,
+jittered retries on transient upstream errors, one concurrency limit and optional hedged requests.
+
+Retries use full jitter (uniform in [0, base * 2^attempt], capped) and honour Retry-After on 429s.
+A call never sleeps or retries past its deadline. Hedging (non-streaming calls only) fires a second
+identical request once the first has been outstanding longer than the recent p95 latency and
+returns whichever finishes first.
+The groq SDK is imported when the client is built (service registry load), not with this module.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from app.core.config import settings
+from app.services.monitoring_service import Monitoring
+
+logger = Monitoring.get_logger()
+
+T = TypeVar("T")
+
+# Successful call latencies kept for the hedge delay (p95)
+_LATENCY_WINDOW = 512
+
+
+class _ConcurrencyLimit:
+    """
+    Upstream slots shared by blocking threads and event-loop tasks (neither asyncio.Semaphore nor
+    threading.Semaphore can serve both). A release wakes every waiter to try again rather than
+    handing the slot over, so a waiter cancelled or timed out while being woken cannot strand it.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._async_waiters: list = []
+
+    def full(self) -> bool:
+        return self._in_use >= self.limit
+
+    def acquire(self, timeout: float) -> bool:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_use < self.limit, timeout):
+                return False
+            self._in_use += 1
+            return True
+
+    async def acquire_async(self) -> None:
+        """Wait for a slot; cancel (e.g. with `asyncio.timeout`) to give up."""
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = loop.create_future()
+            with self._cond:
+                if self._in_use < self.limit:
+                    self._in_use += 1
+                    return
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            waiters, self._async_waiters = self._async_waiters, []
+            self._cond.notify()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class LLMClientStats:
+    """Counters for upstream calls plus a rolling window of successful call latencies."""
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.in_flight = 0
+        self.latencies_ms: deque = deque(maxlen=_LATENCY_WINDOW)
+
+    def quantile_ms(self, q: float) -> Optional[float]:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.quantile_ms(0.5), self.quantile_ms(0.95)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "in_flight": self.in_flight,
+            "p50_ms": round(p50, 1) if p50 is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+        }
+
+
+class ResilientLLMClient:
+    """
+    Chat completions against Groq (or any server at `groq_base_url`).
+    `create` is the blocking variant used by scripts; `acreate` and `astream` serve the API.
+    Blocking and async calls go through separate httpx pools (each sized `llm_pool_connections`)
+    but share one limit of `llm_max_concurrency` calls in flight.
+    For streams the deadline covers opening the stream; afterwards the per-read timeout applies.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        import httpx
+        from groq import (
+            APIConnectionError,
+            APIStatusError,
+            APITimeoutError,
+            AsyncGroq,
+            DefaultAsyncHttpxClient,
+            DefaultHttpxClient,
+            Groq,
+            InternalServerError,
+            RateLimitError,
+        )
+
+        # APITimeoutError subclasses APIConnectionError
+        self.transient_errors = (APIConnectionError, RateLimitError, InternalServerError, asyncio.TimeoutError)
+        self._status_error = APIStatusError
+        self._timeout_errors = (asyncio.TimeoutError, APITimeoutError)
+        timeout = httpx.Timeout(settings.llm_read_timeout_seconds, connect=settings.llm_connect_timeout_seconds)
+        limits = httpx.Limits(
+            max_connections=settings.llm_pool_connections,
+            max_keepalive_connections=settings.llm_pool_connections,
+        )
+        if api_key is None:
+            api_key = settings.groq_api_key or os.environ.get("GROQ_API_KEY", "")
+        base_url = base_url or settings.groq_base_url
+        # Retries are ours (jittered, deadline-aware), so the SDK's own retry loop is off
+        self.sync_client = Groq(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=DefaultHttpxClient(timeout=timeout, limits=limits),
+        )
+        self.async_client = AsyncGroq(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(timeout=timeout, limits=limits),
+        )
+        self.stats = LLMClientStats()
+        self._limit = _ConcurrencyLimit(settings.llm_max_concurrency)
+
+    # --- retry / deadline helpers -------------------------------------------------
+
+    @staticmethod
+    def _deadline(timeout: Optional[float]) -> float:
+        return time.monotonic() + (timeout if timeout is not None else settings.llm_deadline_seconds)
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        cap = settings.llm_retry_max_delay_ms / 1000.0
+        delay = random.uniform(0.0, min(cap, settings.llm_retry_base_delay_ms / 1000.0 * 2 ** attempt))
+        if isinstance(exc, self._status_error):
+            try:
+                delay = max(delay, float(exc.response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    def _should_retry(self, attempt: int, exc: BaseException, delay: float, deadline: float) -> bool:
+        if isinstance(exc, self._timeout_errors):
+            self.stats.timeouts += 1
+        if attempt >= settings.llm_max_retries or time.monotonic() + delay >= deadline:
+            self.stats.errors += 1
+            return False
+        self.stats.retries += 1
+        logger.warning(f"LLM call failed ({type(exc).__name__}), retry {attempt + 1} in {delay:.2f}s")
+        return True
+
+    async def _retry(self, call: Callable[[float], Awaitable[T]], deadline: float) -> T:
+        """Run `call(remaining_seconds)` until it succeeds, retries run out or the deadline passes."""
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stats.timeouts += 1
+                self.stats.errors += 1
+                raise asyncio.TimeoutError("LLM deadline exceeded")
+            try:
+                return await call(remaining)
+            except self.transient_errors as exc:
+                delay = self._backoff(attempt, exc)
+                if not self._should_retry(attempt, exc, delay, deadline):
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _slot(self, deadline: float) -> AsyncIterator[None]:
+        """Hold one of `llm_max_concurrency` upstream slots; waiting for it counts against the deadline."""
+        async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+            await self._limit.acquire_async()
+        self.stats.in_flight += 1
+        try:
+            yield
+        finally:
+            self.stats.in_flight -= 1
+            self._limit.release()
+
+    @contextmanager
+    def _sync_slot(self, deadline: float) -> Iterator[None]:
+        if not self._limit.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError("LLM deadline exceeded waiting for a free slot")
+        self.stats.in_flight += 1
+        try:
+            yield
+        finally:
+            self.stats.in_flight -= 1
+            self._limit.release()
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while hedging is off or latency history is too short."""
+        if not settings.llm_hedge_enabled or len(self.stats.latencies_ms) < settings.llm_hedge_min_samples:
+            return None
+        return max(self.stats.quantile_ms(0.95), settings.llm_hedge_min_delay_ms) / 1000.0
+
+    # --- calls --------------------------------------------------------------------
+
+    async def _attempt(self, kwargs: Dict[str, Any], deadline: float) -> Any:
+        """One retried non-streaming completion; each attempt takes its own concurrency slot."""
+        async def call(remaining: float) -> Any:
+            async with self._slot(deadline):
+                start = time.perf_counter()
+                self.stats.calls += 1
+                response = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(timeout=remaining, **kwargs),
+                    remaining,
+                )
+                self.stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+                return response
+
+        return await self._retry(call, deadline)
+
+    async def acreate(self, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Non-streaming chat completion, hedged after the recent p95 latency when enabled."""
+        deadline = self._deadline(timeout)
+        delay = self._hedge_delay()
+        primary = asyncio.create_task(self._attempt(kwargs, deadline))
+        if delay is None:
+            return await primary
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            # asyncio.wait does not cancel what it waits on; don't leave the call holding a slot
+            primary.cancel()
+            raise
+        if done or self._limit.full():
+            # Finished in time, or no free slot to hedge with
+            return await primary
+
+        self.stats.hedges += 1
+        hedge = asyncio.create_task(self._attempt(kwargs, deadline))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(self, timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[str]:
+        """Stream text deltas; the concurrency slot is held until the stream ends."""
+        deadline = self._deadline(timeout)
+        async with self._slot(deadline):
+            async def open_stream(remaining: float) -> Any:
+                self.stats.calls += 1
+                return await asyncio.wait_for(
+                    self.async_client.chat.completions.create(stream=True, timeout=remaining, **kwargs),
+                    remaining,
+                )
+
+            stream = await self._retry(open_stream, deadline)
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
+
+    def create(self, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Blocking chat completion with the same deadline and retry policy (no hedging)."""
+        deadline = self._deadline(timeout)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stats.timeouts += 1
+                self.stats.errors += 1
+                raise TimeoutError("LLM deadline exceeded")
+            try:
+                with self._sync_slot(deadline):
+                    start = time.perf_counter()
+                    self.stats.calls += 1
+                    response = self.sync_client.chat.completions.create(timeout=remaining, **kwargs)
+                    self.stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+                    return response
+            except self.transient_errors as exc:
+                delay = self._backoff(attempt, exc)
+                if not self._should_retry(attempt, exc, delay, deadline):
+                    raise
+            attempt += 1
+            time.sleep(delay)
+
+
+_client: Optional[ResilientLLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> ResilientLLMClient:
+    """Process-wide shared client (pooled connections, one concurrency limit)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ResilientLLMClient()
+        return _client
@@ -1,17 +1,55 @@
-import os
-from groq import Groq
-from typing import List, Dict, Any
+import asyncio
+import re
+from typing import List, Dict, Any, AsyncIterator, Optional
 from app.core.config import settings
+from app.services.cache_service import LLMResponseCache
+from app.services.llm_client import get_llm_client
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Cached answers are replayed to streaming clients in word-sized deltas
+_REPLAY_PIECE = re.compile(r"\S+\s*|\s+")
+
 class LLMService:
     def __init__(self):
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY", ""))
+        # Shared across instances: pooled connections, one concurrency limit, retries and hedging
+        self.client = get_llm_client()
+        self.response_cache: Optional[LLMResponseCache] = None
+        if settings.llm_cache_enabled:
+            self.response_cache = LLMResponseCache(
+                path=settings.llm_cache_path,
+                max_bytes=int(settings.llm_cache_max_mb * 1024 * 1024),
+                max_age_seconds=settings.llm_cache_max_age_seconds,
+            )
 
-    def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
-        """Generate final answer using groq."""
+    def _cache_key(self, messages: List[Dict[str, str]], context_chunks: List[Dict[str, Any]]) -> str:
+        chunk_ids = [str(doc.get("id", "")) for doc in context_chunks]
+        return LLMResponseCache.make_key(messages, chunk_ids, settings.llm_model, settings.temperature)
+
+    def _cached(self, messages: List[Dict[str, str]], context_chunks: List[Dict[str, Any]]) -> tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cached answer); both None when the response cache is disabled."""
+        if self.response_cache is None:
+            return None, None
+        key = self._cache_key(messages, context_chunks)
+        return key, self.response_cache.get(key)
+
+    def _store(self, key: Optional[str], answer: Optional[str]) -> None:
+        if key is not None and answer:
+            self.response_cache.set(key, answer)
+
+    # The cache reads and commits SQLite; the async paths run that off the event loop
+    async def _acached(self, messages: List[Dict[str, str]], context_chunks: List[Dict[str, Any]]) -> tuple[Optional[str], Optional[str]]:
+        if self.response_cache is None:
+            return None, None
+        return await asyncio.to_thread(self._cached, messages, context_chunks)
+
+    async def _astore(self, key: Optional[str], answer: Optional[str]) -> None:
+        if key is not None and answer:
+            await asyncio.to_thread(self.response_cache.set, key, answer)
+
+    def _build_messages(self, query: str, context_chunks: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the system + user chat messages for the given context."""
         
         # Construct context block
         context_text = ""
@@ -30,13 +68,61 @@ Context Data:
 {context_text}
 """
         
-        response = self.client.chat.completions.create(
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": query}
+        ]
+
+    def generate_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
+        """Generate final answer using groq."""
+        messages = self._build_messages(query, context_chunks)
+        key, cached = self._cached(messages, context_chunks)
+        if cached is not None:
+            return cached
+
+        response = self.client.create(
+            model=settings.llm_model,
+            messages=messages,
+            temperature=settings.temperature,
+        )
+        
+        answer = response.choices[0].message.content
+        self._store(key, answer)
+        return answer
+
+    async def agenerate_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> str:
+        """Generate final answer using the async groq client (does not hold a worker thread)."""
+        messages = self._build_messages(query, context_chunks)
+        key, cached = await self._acached(messages, context_chunks)
+        if cached is not None:
+            return cached
+
+        response = await self.client.acreate(
             model=settings.llm_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query}
-            ],
+            messages=messages,
             temperature=settings.temperature,
         )
         
-        return response.choices[0].message.content
+        answer = response.choices[0].message.content
+        await self._astore(key, answer)
+        return answer
+
+    async def astream_answer(self, query: str, context_chunks: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """Stream answer text deltas from groq as they are generated (cached answers are replayed)."""
+        messages = self._build_messages(query, context_chunks)
+        key, cached = await self._acached(messages, context_chunks)
+        if cached is not None:
+            for piece in _REPLAY_PIECE.findall(cached):
+                yield piece
+            return
+
+        # Only a stream that ran to completion is cached; a client disconnect closes this generator early
+        parts: List[str] = []
+        async for delta in self.client.astream(
+            model=settings.llm_model,
+            messages=messages,
+            temperature=settings.temperature,
+        ):
+            parts.append(delta)
+            yield delta
+        await self._astore(key, "".join(parts))
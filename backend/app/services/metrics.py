@@ -0,0 +1,141 @@
+"""
+Prometheus Metrics
+Per-stage latency histograms and request counters kept in process and rendered in the Prometheus
+text exposition format by GET /metrics. Stages timed by the routes: guardrail, embed, dense,
+sparse, fusion, retrieval (dense + sparse + fusion wall time), rerank, compression, llm and
+llm_first_token. Point-in-time values (cache hit rates, queue depths) are passed in at scrape time
+by the caller. Stage timings are also collected per request for the Server-Timing header.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_HELP = {
+    "rag_stage_latency_seconds": ("histogram", "Latency of one pipeline stage within a request"),
+    "rag_request_latency_seconds": ("histogram", "End-to-end latency of traced requests"),
+    "rag_requests_total": ("counter", "Traced requests by endpoint and outcome (ok, rejected, error)"),
+    "rag_cache_hits_total": ("counter", "Cache hits since startup"),
+    "rag_cache_misses_total": ("counter", "Cache misses since startup"),
+    "rag_cache_hit_ratio": ("gauge", "Cache hit ratio since startup"),
+    "rag_queue_depth": ("gauge", "Items waiting in a shared queue"),
+    "rag_llm_in_flight": ("gauge", "Upstream LLM calls in flight"),
+    "rag_traces_total": ("counter", "Request traces by sampling decision"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Stage -> milliseconds for the request running in this context (None outside a collecting request)
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: Labels) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+        inf = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(labels, inf)} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters keyed by (metric name, sorted labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """Record a stage duration in the histogram and in the current request's timings, if collected."""
+        self.observe("rag_stage_latency_seconds", seconds, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Observe the wall time of the enclosed block as `rag_stage_latency_seconds{stage=...}`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    @staticmethod
+    def collect_request_timings(timings: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Start collecting stage timings (ms, summed per stage) for the current request task, into
+        `timings` when given (e.g. to carry them into a streaming response's generator).
+        Tasks spawned afterwards (asyncio.gather) share the same dict through the copied context.
+        """
+        timings = {} if timings is None else timings
+        _request_timings.set(timings)
+        return timings
+
+    def render(self, samples: Dict[str, List[Tuple[Dict[str, str], float]]]) -> str:
+        """Exposition text for the recorded metrics plus scrape-time `samples` (name -> [(labels, value)])."""
+        series: Dict[str, List[str]] = {}
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                series.setdefault(name, []).extend(histogram.render(name, labels))
+            for (name, labels), value in sorted(self._counters.items()):
+                series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+        for name, values in samples.items():
+            for labels, value in values:
+                series.setdefault(name, []).append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+
+        lines = []
+        for name, values in series.items():
+            kind, text = _HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(values)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,89 @@
+"""
+Model Loading
+Builds the embedding model and cross-encoders for the configured inference backend.
+Serving and ingestion both load through here, so query and chunk vectors always come
+from the same weights and runtime.
+
+Backends:
+  torch      PyTorch fp32 (sentence-transformers default)
+  onnx       ONNX Runtime fp32
+  onnx-int8  ONNX Runtime with dynamically quantized int8 weights
+
+ONNX exports are written once to `settings.onnx_cache_dir` and reused on later starts.
+The ONNX backends need `sentence-transformers[onnx]>=4.1` (optimum + onnxruntime).
+sentence-transformers (and torch behind it) is imported on the first load, not with this module.
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_ONNX_FILE = "onnx/model.onnx"
+
+
+def _export_dir(model_name: str) -> Path:
+    return Path(settings.onnx_cache_dir) / model_name.replace("/", "__")
+
+
+def _int8_file() -> str:
+    return f"onnx/model_qint8_{settings.onnx_quantization_config}.onnx"
+
+
+def _load(cls: Any, model_name: str, backend: Optional[str], **kwargs) -> Any:
+    backend = backend or settings.inference_backend
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+    if backend == "torch":
+        return cls(model_name, **kwargs)
+
+    export_dir = _export_dir(model_name)
+    if not (export_dir / _ONNX_FILE).exists():
+        logger.info(f"Exporting {model_name} to ONNX at {export_dir} (first use)")
+        cls(model_name, backend="onnx", **kwargs).save_pretrained(str(export_dir))
+
+    file_name = _ONNX_FILE
+    if backend == "onnx-int8":
+        file_name = _int8_file()
+        if not (export_dir / file_name).exists():
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            logger.info(f"Quantizing {model_name} to int8 ({settings.onnx_quantization_config})")
+            export_dynamic_quantized_onnx_model(
+                cls(str(export_dir), backend="onnx", model_kwargs={"file_name": _ONNX_FILE}, **kwargs),
+                quantization_config=settings.onnx_quantization_config,
+                model_name_or_path=str(export_dir),
+                file_suffix=f"qint8_{settings.onnx_quantization_config}",
+            )
+
+    return cls(str(export_dir), backend="onnx", model_kwargs={"file_name": file_name}, **kwargs)
+
+
+def load_embedding_model(model_name: Optional[str] = None, backend: Optional[str] = None) -> SentenceTransformer:
+    """SentenceTransformer for `model_name` (default: settings.embedding_model) on the given backend."""
+    from sentence_transformers import SentenceTransformer
+
+    return _load(SentenceTransformer, model_name or settings.embedding_model, backend)
+
+
+def load_cross_encoder(model_name: str, max_length: int = 512, backend: Optional[str] = None) -> CrossEncoder:
+    """CrossEncoder for `model_name` on the given backend (default: settings.inference_backend)."""
+    from sentence_transformers import CrossEncoder
+
+    return _load(CrossEncoder, model_name, backend, max_length=max_length)
+
+
+def model_cache_name(model_name: str, backend: Optional[str] = None) -> str:
+    """Model identity for cache keys; quantized weights score slightly differently from fp32."""
+    backend = backend or settings.inference_backend
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
@@ -1,28 +1,233 @@
 """
-Logging & Langfuse Monitoring Setup
-Monitors traces via the v3 Langfuse client.
+Logging, Tracing & Langfuse Export
+Request traces are recorded in memory through the same observation API the routes used on the
+Langfuse client (`start_as_current_observation`, `update`, `update_trace`). When a root observation
+ends, the trace is kept if it raised, ran longer than `trace_slow_request_ms`, or falls inside
+`trace_sample_rate`. A client error (HTTPException below 500, e.g. a guardrail-blocked query) is a
+"rejected" outcome, not a failure, and stays subject to sampling. Kept traces are replayed into
+Langfuse by a background thread, so a request never waits on the exporter. The Langfuse client is
+created on first export and only when keys are configured.
 """
-from langfuse import get_client
+import contextvars
 import logging
 import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+
 from app.core.config import settings
+from app.services.metrics import metrics
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-7s | %(name)s | %(message)s")
 logger = logging.getLogger("rag_backend")
 
-# Ensure environment variables are set before get_client is called, or pass them if needed
-# get_client() automatically looks for LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY, LANGFUSE_HOST
-os.environ["LANGFUSE_PUBLIC_KEY"] = settings.langfuse_public_key or os.environ.get("LANGFUSE_PUBLIC_KEY") or "dummy"
-os.environ["LANGFUSE_SECRET_KEY"] = settings.langfuse_secret_key or os.environ.get("LANGFUSE_SECRET_KEY") or "dummy"
-os.environ["LANGFUSE_HOST"] = settings.langfuse_host or os.environ.get("LANGFUSE_HOST", "http://localhost:3000")
+_current: contextvars.ContextVar[Optional["Observation"]] = contextvars.ContextVar("current_observation", default=None)
+
+
+class Observation:
+    """One recorded span / generation; `update` and `update_trace` mirror the Langfuse span methods."""
+
+    def __init__(self, name: str, as_type: str, input: Any, attributes: Dict[str, Any], root: Optional["Observation"]):
+        self.name = name
+        self.as_type = as_type
+        self.input = input
+        self.attributes = attributes  # e.g. model for generations
+        self.output: Any = None
+        self.metadata: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.rejection: Optional[str] = None  # client error (4xx) raised through this observation
+        self.children: List["Observation"] = []
+        self.root = root or self
+        self.trace: Dict[str, Any] = {}
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+
+    def update(self, output: Any = None, metadata: Optional[Dict[str, Any]] = None, **attributes: Any) -> None:
+        if output is not None:
+            self.output = output
+        if metadata:
+            self.metadata.update(metadata)
+        self.attributes.update(attributes)
+
+    def update_trace(self, **attributes: Any) -> None:
+        self.root.trace.update(attributes)
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or any(child.failed for child in self.children)
+
+
+class _TraceExporter:
+    """Bounded queue of kept traces drained into Langfuse by one daemon thread."""
+
+    def __init__(self, max_queue: int):
+        self._queue: "queue.Queue[Observation]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, root: Observation) -> None:
+        # The client itself is built on the exporter thread, never on the request path
+        if not Monitoring.langfuse_configured():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(root)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            root = self._queue.get()
+            try:
+                self._export(Monitoring.get_langfuse(), root)
+                self.exported += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Trace export failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _export(self, client: Any, obs: Observation) -> None:
+        with client.start_as_current_observation(as_type=obs.as_type, name=obs.name, input=obs.input, **obs.attributes) as span:
+            if obs.root is obs and obs.trace:
+                span.update_trace(**obs.trace)
+            for child in obs.children:
+                self._export(client, child)
+            # Replay happens after the fact, so the real timing travels in metadata
+            timing = {
+                "started_at": datetime.fromtimestamp(obs.started_at, tz=timezone.utc).isoformat(),
+                "duration_ms": round(obs.duration_ms, 2),
+            }
+            update: Dict[str, Any] = {"output": obs.output, "metadata": {**obs.metadata, **timing}}
+            if obs.error is not None:
+                update.update(level="ERROR", status_message=obs.error)
+            elif obs.rejection is not None:
+                update.update(level="WARNING", status_message=obs.rejection)
+            span.update(**update)
+
+    def flush(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+class Tracer:
+    """Records nested observations per request (context-local) and decides which traces to keep."""
+
+    def __init__(self):
+        self.exporter = _TraceExporter(settings.trace_export_queue_size)
+        self.decisions: Dict[str, int] = {"error": 0, "slow": 0, "sampled": 0, "dropped": 0}
+
+    @contextmanager
+    def start_as_current_observation(self, *, as_type: str = "span", name: str, input: Any = None, **attributes: Any) -> Iterator[Observation]:
+        parent = _current.get()
+        obs = Observation(name, as_type, input, attributes, parent.root if parent else None)
+        token = _current.set(obs)
+        start = time.perf_counter()
+        try:
+            yield obs
+        except HTTPException as e:
+            if e.status_code < 500:
+                obs.rejection = f"{e.status_code}: {e.detail}"
+            else:
+                obs.error = f"{type(e).__name__}: {e}"
+            raise
+        except Exception as e:
+            obs.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            obs.duration_ms = (time.perf_counter() - start) * 1000
+            _current.reset(token)
+            if parent is not None:
+                parent.children.append(obs)
+            else:
+                self._finish(obs)
+
+    def _finish(self, root: Observation) -> None:
+        failed = root.failed
+        outcome = "error" if failed else "rejected" if root.rejection is not None else "ok"
+        metrics.observe("rag_request_latency_seconds", root.duration_ms / 1000, endpoint=root.name)
+        metrics.inc("rag_requests_total", endpoint=root.name, outcome=outcome)
+
+        if failed:
+            decision = "error"
+        elif root.duration_ms >= settings.trace_slow_request_ms:
+            decision = "slow"
+        elif random.random() < settings.trace_sample_rate:
+            decision = "sampled"
+        else:
+            decision = "dropped"
+        self.decisions[decision] += 1
+        if decision != "dropped":
+            root.metadata["trace_reason"] = decision
+            self.exporter.submit(root)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.decisions,
+            "export_queue_depth": self.exporter.queue_depth,
+            "exported": self.exporter.exported,
+            "export_dropped": self.exporter.dropped,
+            "export_failed": self.exporter.failed,
+        }
+
+
+_tracer = Tracer()
+_langfuse: Any = None
+_langfuse_lock = threading.Lock()
 
-langfuse = get_client()
 
 class Monitoring:
     @staticmethod
     def get_logger() -> logging.Logger:
         return logger
 
+    @staticmethod
+    def get_tracer() -> Tracer:
+        return _tracer
+
+    @staticmethod
+    def langfuse_configured() -> bool:
+        public_key = settings.langfuse_public_key or os.environ.get("LANGFUSE_PUBLIC_KEY")
+        secret_key = settings.langfuse_secret_key or os.environ.get("LANGFUSE_SECRET_KEY")
+        return bool(public_key and secret_key)
+
     @staticmethod
     def get_langfuse():
-        return langfuse
+        """Langfuse client, created on first use; None when no keys are configured."""
+        global _langfuse
+        if not Monitoring.langfuse_configured():
+            return None
+        with _langfuse_lock:
+            if _langfuse is None:
+                from langfuse import get_client
+
+                # get_client() reads LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY and LANGFUSE_HOST
+                os.environ["LANGFUSE_PUBLIC_KEY"] = settings.langfuse_public_key or os.environ["LANGFUSE_PUBLIC_KEY"]
+                os.environ["LANGFUSE_SECRET_KEY"] = settings.langfuse_secret_key or os.environ["LANGFUSE_SECRET_KEY"]
+                os.environ["LANGFUSE_HOST"] = settings.langfuse_host or os.environ.get("LANGFUSE_HOST", "http://localhost:3000")
+                _langfuse = get_client()
+            return _langfuse
+
+    @staticmethod
+    def flush(timeout: float = 5.0) -> None:
+        """Drain queued traces into Langfuse and flush its client (shutdown)."""
+        _tracer.exporter.flush(timeout)
+        if _langfuse is not None:
+            _langfuse.flush()
@@ -0,0 +1,97 @@
+"""
+Query Router
+Picks a retrieval plan per query from cheap lexical features: dense only, sparse (BM25) only,
+or hybrid, plus how many candidates each path feeds into fusion and reranking.
+
+Lexical lookups (exact amounts, table rows, quoted names, product acronyms) are answered well by
+BM25 alone; conversational questions with no rare anchor terms are answered by the dense path.
+Everything in between keeps the full hybrid plan.
+"""
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.bm25_index import BM25Index, tokenize
+
+_AMOUNT = re.compile(r"[$₹€£]\s?\d|\d[\d,]*(?:\.\d+)?\s?%|\b\d{2,}[\d,]*\b")
+_TABLE_REF = re.compile(r"\b(?:table|row)\s*\d+", re.IGNORECASE)
+_QUOTED = re.compile(r"[\"“”'‘’][^\"“”'‘’]{2,}[\"“”'‘’]")
+_ACRONYM = re.compile(r"\b[A-Z]{2,}\b")
+_SEMANTIC_CUES = re.compile(r"\b(?:why|how|explain|describe|difference|compare|what happens|should i|can i)\b", re.IGNORECASE)
+
+# A term in fewer than this share of chunks is a strong lexical anchor
+_RARE_DF_RATIO = 0.02
+
+
+@dataclass
+class RetrievalPlan:
+    mode: str  # "hybrid", "dense" or "sparse"
+    top_k_vector: int
+    top_k_bm25: int
+    top_k_fusion: int
+    reason: str = ""
+    features: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def use_dense(self) -> bool:
+        return self.mode in ("hybrid", "dense")
+
+    @property
+    def use_sparse(self) -> bool:
+        return self.mode in ("hybrid", "sparse")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def hybrid(cls, reason: str = "default", features: Optional[Dict[str, Any]] = None) -> "RetrievalPlan":
+        return cls("hybrid", settings.top_k_vector, settings.top_k_bm25, settings.top_k_fusion, reason, features or {})
+
+
+class QueryRouter:
+    """Heuristic router; uses the BM25 vocabulary and document frequencies to judge lexical anchors."""
+
+    def __init__(self, bm25: Optional[BM25Index] = None, mode: Optional[str] = None):
+        self.bm25 = bm25
+        self.mode = mode or settings.query_router
+
+    def features(self, query: str) -> Dict[str, Any]:
+        terms = tokenize(query)
+        features: Dict[str, Any] = {
+            "terms": len(terms),
+            "amounts": len(_AMOUNT.findall(query)),
+            "table_refs": len(_TABLE_REF.findall(query)),
+            "quoted": len(_QUOTED.findall(query)),
+            "acronyms": len(_ACRONYM.findall(query)),
+            "semantic_cues": len(_SEMANTIC_CUES.findall(query)),
+            "vocab_coverage": 0.0,
+            "rare_terms": 0,
+        }
+        if self.bm25 is not None and terms and len(self.bm25):
+            known = [self.bm25.vocab[t] for t in terms if t in self.bm25.vocab]
+            features["vocab_coverage"] = round(len(known) / len(terms), 3)
+            if known:
+                term_ids = np.asarray(known, dtype=np.int64)
+                doc_freq = np.asarray(self.bm25.indptr[term_ids + 1] - self.bm25.indptr[term_ids])
+                features["rare_terms"] = int(np.count_nonzero(doc_freq <= max(1.0, _RARE_DF_RATIO * len(self.bm25))))
+        return features
+
+    def plan(self, query: str) -> RetrievalPlan:
+        if self.mode != "heuristic":
+            return RetrievalPlan.hybrid()
+
+        f = self.features(query)
+        depth = settings.router_single_path_depth
+        lexical = f["amounts"] + 2 * f["table_refs"] + 2 * f["quoted"] + f["acronyms"]
+
+        if self.bm25 is not None and f["vocab_coverage"] == 0.0:
+            # BM25 cannot match a single query term
+            return RetrievalPlan("dense", depth, 0, depth, "no query term in the BM25 vocabulary", f)
+        if lexical >= 3 and f["rare_terms"] >= 1 and not f["semantic_cues"]:
+            return RetrievalPlan("sparse", 0, depth, depth, "lookup with exact anchors (amounts / table rows / names)", f)
+        if lexical == 0 and f["rare_terms"] == 0:
+            return RetrievalPlan("dense", depth, 0, depth, "no lexical anchors", f)
+        return RetrievalPlan.hybrid("mixed lexical and semantic signals", f)
@@ -1,25 +1,268 @@
 """
 Cross-Encoder Reranking
 Scores query-document pairs using a fine-tuned cross-encoder.
+In "cascade" mode a cheap first stage prunes the fused candidates so only the survivors reach it.
+Chunk token ids come from the ingestion-time token store, so only the query is tokenized per request.
+torch is imported when the service is constructed, so importing this module stays cheap.
 """
-from typing import List, Dict, Any
-from sentence_transformers import CrossEncoder
+from __future__ import annotations
+
+import asyncio
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+import numpy as np
 from app.core.config import settings
+from app.core.utils import read_index_version
+from app.db.chunk_store import ChunkStore
+from app.db.token_store import TokenStore
+from app.services.batching import MicroBatcher
+from app.services.cache_service import RerankScoreCache
+from app.services.model_loader import load_cross_encoder, load_embedding_model, model_cache_name
+from app.services.monitoring_service import Monitoring
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+logger = Monitoring.get_logger()
+
+MAX_LENGTH = 512
+
+# (query, chunk text, chunk id) — the id selects pre-tokenized chunk ids when available
+RerankPair = Tuple[str, str, Optional[str]]
 
 class RerankerService:
-    def __init__(self):
-        self.bge_reranker = CrossEncoder(settings.reranker_model, max_length=512)
+    def __init__(self, embedding_model: Optional[SentenceTransformer] = None, chunk_store: Optional[ChunkStore] = None):
+        import torch
 
-    def score_and_rank(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Score each document using the reranker and sort."""
-        if not documents:
-            return []
-            
-        pairs = [[query, doc["text"]] for doc in documents]
-        scores = self.bge_reranker.predict(pairs)
-        
+        self.bge_reranker = load_cross_encoder(settings.reranker_model, max_length=MAX_LENGTH)
+        # Same activation CrossEncoder.predict applies (Sigmoid/Identity depending on the version)
+        self.activation = (
+            getattr(self.bge_reranker, "activation_fn", None)
+            or getattr(self.bge_reranker, "default_activation_function", None)
+            or torch.nn.Identity()
+        )
+        # Chunk token ids written at ingestion (or rebuilt from the chunk store when stale)
+        self.token_store = self._load_token_store(chunk_store)
+        # Shared queue so pairs from concurrent requests are scored in one predict call
+        self.batcher = MicroBatcher(
+            name="reranker",
+            process_fn=self._predict,
+            max_batch_size=settings.rerank_max_batch_size,
+            max_wait_ms=settings.rerank_max_wait_ms,
+        )
+        # Only (query, chunk) pairs missing here are sent to the cross-encoder
+        self.score_cache = RerankScoreCache(
+            model_name=model_cache_name(settings.reranker_model),
+            max_entries=settings.rerank_cache_max_entries,
+            disk_path=settings.rerank_cache_path,
+        )
+
+        # Cascade settings live on the instance so the eval script can sweep them
+        self.mode = settings.reranker_mode
+        self.first_stage_keep = settings.cascade_first_stage_keep
+        self.early_exit_margin = settings.cascade_early_exit_margin
+        self.first_stage_model: Optional[CrossEncoder] = None
+        self.first_stage_embedder = embedding_model
+        self.cascade_stats = {"queries": 0, "candidates": 0, "survivors": 0, "early_exits": 0}
+        self._cascade_lock = threading.Lock()  # the first stage runs on worker threads
+        if self.mode == "cascade":
+            self._ensure_first_stage()
+
+    def _ensure_first_stage(self) -> None:
+        if settings.cascade_first_stage == "dense":
+            if self.first_stage_embedder is None:
+                self.first_stage_embedder = load_embedding_model()
+        elif self.first_stage_model is None:
+            self.first_stage_model = load_cross_encoder(settings.cascade_first_stage_model, max_length=512)
+
+    def _load_token_store(self, chunk_store: Optional[ChunkStore]) -> Optional[TokenStore]:
+        """Memory-map the reranker token store, rebuilding it from `chunk_store` if missing or stale."""
+        store_dir = Path(settings.rerank_token_dir)
+        version = read_index_version()
+        if TokenStore.exists(store_dir):
+            store = TokenStore.open(store_dir)
+            if store.version == version and store.tokenizer_name == settings.reranker_model:
+                logger.info(f"Reranker token store loaded ({len(store)} chunks).")
+                return store
+        if chunk_store is None:
+            return None
+
+        TokenStore.write(
+            store_dir,
+            chunk_store.ids,
+            chunk_store.iter_texts(),
+            tokenizer=self.bge_reranker.tokenizer,
+            tokenizer_name=settings.reranker_model,
+            max_length=MAX_LENGTH,
+            version=version,
+        )
+        logger.info(f"Reranker token store built from chunk store ({len(chunk_store)} chunks).")
+        return TokenStore.open(store_dir)
+
+    def _predict(self, pairs: List[RerankPair]) -> List[float]:
+        if self.token_store is None or self.token_store.version != read_index_version():
+            scores = self.bge_reranker.predict([[query, text] for query, text, _ in pairs], batch_size=settings.rerank_max_batch_size)
+            return [float(score) for score in scores]
+
+        tokenizer = self.bge_reranker.tokenizer
+        queries = list(dict.fromkeys(query for query, _, _ in pairs))
+        query_ids = dict(zip(queries, tokenizer(queries, add_special_tokens=False)["input_ids"]))
+        features = []
+        for query, text, chunk_id in pairs:
+            chunk_ids = self.token_store.get(chunk_id)
+            if chunk_ids is None:
+                chunk_ids = tokenizer(text, add_special_tokens=False, truncation=True, max_length=MAX_LENGTH)["input_ids"]
+            # Same special tokens and longest-first truncation as tokenizing the text pair
+            features.append(tokenizer.prepare_for_model(query_ids[query], chunk_ids, truncation="longest_first", max_length=MAX_LENGTH))
+
+        import torch
+
+        model = self.bge_reranker.model
+        scores: List[float] = []
+        with torch.inference_mode():
+            for start in range(0, len(features), settings.rerank_max_batch_size):
+                batch = tokenizer.pad(features[start:start + settings.rerank_max_batch_size], return_tensors="pt").to(model.device)
+                logits = model(**batch).logits
+                scores.extend(float(score) for score in self.activation(logits)[:, 0])
+        return scores
+
+    def _first_stage_scores(self, queries: List[str], documents_per_query: List[List[Dict[str, Any]]]) -> List[List[float]]:
+        """Cheap relevance scores for every candidate of every query, computed in one model call."""
+        self._ensure_first_stage()
+        if settings.cascade_first_stage != "dense":
+            pairs = [[query, doc["text"]] for query, docs in zip(queries, documents_per_query) for doc in docs]
+            flat = self.first_stage_model.predict(pairs, batch_size=settings.rerank_max_batch_size)
+        else:
+            # Vector hits already carry their cosine distance; only BM25-only hits need encoding
+            texts = [doc["text"] for docs in documents_per_query for doc in docs if "distance" not in doc]
+            vectors = self.first_stage_embedder.encode(queries + texts, normalize_embeddings=True)
+            query_vectors, text_vectors = vectors[:len(queries)], iter(vectors[len(queries):])
+            flat = [
+                1.0 - doc["distance"] if "distance" in doc else float(query_vectors[q] @ next(text_vectors))
+                for q, docs in enumerate(documents_per_query)
+                for doc in docs
+            ]
+
+        scores, offset = [], 0
+        for docs in documents_per_query:
+            scores.append([float(s) for s in flat[offset:offset + len(docs)]])
+            offset += len(docs)
+        return scores
+
+    def _prune(self, documents: List[Dict[str, Any]], scores: List[float]) -> List[Dict[str, Any]]:
+        """
+        Keep the `first_stage_keep` best candidates by first-stage score. If the gap between the
+        last candidate that would be returned (position top_k_rerank) and the next one is at least
+        `early_exit_margin` of the first-stage score range, the cut is decisive and only the
+        top_k_rerank candidates are sent on, leaving the heavy model just their ordering.
+        """
+        k = settings.top_k_rerank
+        arr = np.asarray(scores, dtype=np.float32)
+        order = np.argsort(-arr, kind="stable")
+        keep = max(self.first_stage_keep, k)
+
+        spread = float(arr[order[0]] - arr[order[-1]])
+        gap = float(arr[order[k - 1]] - arr[order[k]])
+        early_exit = spread > 0 and gap / spread >= self.early_exit_margin
+        if early_exit:
+            keep = k
+
+        with self._cascade_lock:
+            self.cascade_stats["early_exits"] += early_exit
+            self.cascade_stats["queries"] += 1
+            self.cascade_stats["candidates"] += len(documents)
+            self.cascade_stats["survivors"] += min(keep, len(documents))
+        return [documents[i] for i in order[:keep]]
+
+    def _cascade(self, queries: List[str], documents_per_query: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """First stage of cascade mode; a no-op in single mode or when nothing would be pruned."""
+        if self.mode != "cascade":
+            return documents_per_query
+        todo = [i for i, docs in enumerate(documents_per_query) if len(docs) > settings.top_k_rerank]
+        if not todo:
+            return documents_per_query
+
+        scores = self._first_stage_scores([queries[i] for i in todo], [documents_per_query[i] for i in todo])
+        pruned = list(documents_per_query)
+        for i, doc_scores in zip(todo, scores):
+            pruned[i] = self._prune(documents_per_query[i], doc_scores)
+        return pruned
+
+    @staticmethod
+    def _rank(documents: List[Dict[str, Any]], scores: List[float]) -> List[Dict[str, Any]]:
         for idx, score in enumerate(scores):
             documents[idx]["reranker_score"] = float(score)
 
         sorted_docs = sorted(documents, key=lambda x: x["reranker_score"], reverse=True)
         return sorted_docs[:settings.top_k_rerank]
+
+    def _fill_scores(self, query: str, documents: List[Dict[str, Any]], scores: List[Optional[float]], missing: List[int], new_scores: List[float]) -> List[float]:
+        for i, score in zip(missing, new_scores):
+            scores[i] = score
+        self.score_cache.set_many(query, [documents[i] for i in missing], new_scores)
+        return scores
+
+    def score_and_rank(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score each document using the reranker and sort."""
+        if not documents:
+            return []
+
+        documents = self._cascade([query], [documents])[0]
+        scores = self.score_cache.get_many(query, documents)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            pairs = [(query, documents[i]["text"], documents[i].get("id")) for i in missing]
+            scores = self._fill_scores(query, documents, scores, missing, self._predict(pairs))
+        return self._rank(documents, scores)
+
+    async def ascore_and_rank(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Same as score_and_rank, but scored through the shared micro-batching queue."""
+        if not documents:
+            return []
+
+        if self.mode == "cascade":
+            documents = (await asyncio.to_thread(self._cascade, [query], [documents]))[0]
+        scores = await self._cache_io(self.score_cache.get_many, query, documents)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            pairs = [(query, documents[i]["text"], documents[i].get("id")) for i in missing]
+            new_scores = await self.batcher.submit(pairs)
+            scores = await self._cache_io(self._fill_scores, query, documents, scores, missing, new_scores)
+        return self._rank(documents, scores)
+
+    async def _cache_io(self, fn, *args):
+        """
+        With a SQLite spill the score cache reads and commits under a lock that a batch rerank on an
+        executor thread may hold, so those calls run off the event loop; the in-memory LRU stays inline.
+        """
+        if self.score_cache.on_disk:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def score_and_rank_batch(self, queries: List[str], documents_per_query: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """Rerank candidates for many queries with every uncached pair scored in one predict call."""
+        documents_per_query = self._cascade(queries, documents_per_query)
+        all_scores = [self.score_cache.get_many(q, docs) if docs else [] for q, docs in zip(queries, documents_per_query)]
+        missing = [
+            [i for i, score in enumerate(scores) if score is None]
+            for scores in all_scores
+        ]
+        pairs = [
+            (query, docs[i]["text"], docs[i].get("id"))
+            for query, docs, idxs in zip(queries, documents_per_query, missing)
+            for i in idxs
+        ]
+        new_scores = self._predict(pairs) if pairs else []
+
+        ranked = []
+        offset = 0
+        for query, docs, scores, idxs in zip(queries, documents_per_query, all_scores, missing):
+            if not docs:
+                ranked.append([])
+                continue
+            if idxs:
+                scores = self._fill_scores(query, docs, scores, idxs, new_scores[offset:offset + len(idxs)])
+                offset += len(idxs)
+            ranked.append(self._rank(docs, scores))
+        return ranked
@@ -1,19 +1,26 @@
 """
-Retriever Module handling Chroma Vector DB & Whoosh BM25 Lexical DB.
+Retriever Module handling Chroma Vector DB & in-memory BM25 Lexical Index.
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from whoosh.index import open_dir, create_in, exists_in
-from whoosh.fields import Schema, TEXT, ID
-from whoosh.qparser import QueryParser
+import numpy as np
 
 from app.core.config import settings
+from app.core.utils import normalize_query, read_index_version
 from app.services.monitoring_service import Monitoring
 from app.db.chroma_client import chroma_client
+from app.db.bm25_index import BM25Index
+from app.db.chunk_store import ChunkStore
+from app.db.dense_index import ExactDenseIndex
+from app.services.batching import MicroBatcher
+from app.services.cache_service import LRUCache
+from app.services.model_loader import load_embedding_model, model_cache_name
 
 logger = Monitoring.get_logger()
 
+# Chunk metadata fields retrieval can be filtered on (see RetrievalFilters)
+FILTER_FIELDS = ("doc_id", "file_name", "document_type", "contains_table")
+
 class RetrievalService:
     def __init__(self):
         # 1. Init ChromaDB via Wrapper Component
@@ -25,70 +32,250 @@ class RetrievalService:
             logger.error(f"Failed to load ChromaDB collection. Has ingestion run? {e}")
             self.collection = None
             
-        # 2. Init Embedding model
-        self.embedding_model = SentenceTransformer(settings.embedding_model)
-        
-        # 3. Init BM25 Whoosh
-        self.whoosh_dir = Path(settings.whoosh_index_dir)
-        self._ensure_whoosh_index()
-
-    def _ensure_whoosh_index(self):
-        """Construct a lightweight BM25 Whoosh index from the Chroma DB documents if not exists."""
-        schema = Schema(doc_id=ID(stored=True, unique=True), content=TEXT(stored=True))
-        
-        if not self.whoosh_dir.exists():
-            self.whoosh_dir.mkdir(parents=True)
-            
-        if not exists_in(str(self.whoosh_dir)):
-            ix = create_in(str(self.whoosh_dir), schema)
-            writer = ix.writer()
+        # 1b. Chunk store: retrievers return ids + scores, text/metadata are hydrated from here
+        self.chunk_store = self._load_chunk_store()
             
-            # Sync documents from chroma to whoosh
-            if self.collection:
-                all_docs = self.collection.get()
-                ids = all_docs.get("ids", [])
-                docs = all_docs.get("documents", [])
-                for idx, text in zip(ids, docs):
-                    writer.add_document(doc_id=str(idx), content=text)
-            writer.commit()
-            logger.info("BM25 Whoosh Index Constructed from ChromaDB records.")
+        # 2. Init Embedding model (+ shared queue coalescing concurrent query encodes)
+        self.embedding_model = load_embedding_model()
+        self.embed_batcher = MicroBatcher(
+            name="embedder",
+            process_fn=self._encode,
+            max_batch_size=settings.embed_max_batch_size,
+            max_wait_ms=settings.embed_max_wait_ms,
+        )
         
-        self.ix = open_dir(str(self.whoosh_dir))
+        # 2b. Optional exact dense index (memory-mapped matrix) instead of Chroma HNSW queries
+        self.dense_index = self._load_dense_index() if settings.dense_backend == "mmap" else None
+        
+        # 3. Init BM25 (memory-mapped, rebuilt from Chroma when the index version changes)
+        self.bm25_dir = Path(settings.bm25_index_dir)
+        self.bm25 = self._load_bm25_index()
+
+        # 4. Hot-query caches, keyed on model name + index version so re-ingestion never serves stale entries
+        self.embedding_cache = LRUCache(max_entries=settings.embedding_cache_max_entries)
+        self.bm25_cache = LRUCache(max_entries=settings.bm25_cache_max_entries)
+
+        # 5. Metadata filters: masks are computed in chunk-store row space and mapped to each index's rows
+        self.filter_cache = LRUCache(max_entries=256)
+        self._bm25_rows = self._row_map(self.bm25.ids)
+        self._dense_rows = self._row_map(self.dense_index.ids) if self.dense_index is not None else None
+
+    def _load_chunk_store(self) -> ChunkStore:
+        """Memory-map the chunk store written by ingestion, exporting it from Chroma if missing or stale."""
+        store_dir = Path(settings.chunk_store_dir)
+        version = read_index_version()
+        if ChunkStore.exists(store_dir):
+            store = ChunkStore.open(store_dir)
+            if store.version == version:
+                logger.info(f"Chunk store loaded ({len(store)} chunks).")
+                return store
+
+        ids, docs, metas = [], [], []
+        if self.collection:
+            all_docs = self.collection.get(include=["documents", "metadatas"])
+            ids = [str(idx) for idx in all_docs.get("ids", [])]
+            docs, metas = all_docs.get("documents", []), all_docs.get("metadatas", [])
+
+        ChunkStore.write(store_dir, ids, docs, metas, version=version)
+        logger.info(f"Chunk store exported from ChromaDB records ({len(ids)} chunks).")
+        return ChunkStore.open(store_dir)
+
+    def _load_bm25_index(self) -> BM25Index:
+        """Memory-map the persisted BM25 index, building it from the chunk store if missing or stale."""
+        version = read_index_version()
+        if BM25Index.exists(self.bm25_dir):
+            index = BM25Index.load(self.bm25_dir)
+            if index.version == version:
+                logger.info(f"BM25 Index Loaded ({len(index)} docs, version {version}).")
+                return index
+
+        index = BM25Index.build(self.chunk_store.ids, self.chunk_store.iter_texts(), k1=settings.bm25_k1, b=settings.bm25_b, version=version)
+        index.save(self.bm25_dir)
+        logger.info(f"BM25 Index Constructed from chunk store ({len(index)} docs).")
+        return BM25Index.load(self.bm25_dir)
+
+    def _load_dense_index(self) -> ExactDenseIndex:
+        """Memory-map the exact dense index, exporting it from Chroma if missing or stale."""
+        dense_dir = Path(settings.dense_index_dir)
+        version = read_index_version()
+        if ExactDenseIndex.exists(dense_dir):
+            index = ExactDenseIndex.load(dense_dir)
+            if index.version == version and index.matrix.dtype == settings.dense_index_dtype:
+                logger.info(f"Exact dense index loaded ({len(index)} vectors, {index.matrix.dtype}).")
+                return index
+
+        ids, embeddings = [], []
+        if self.collection:
+            all_docs = self.collection.get(include=["embeddings"])
+            ids = [str(idx) for idx in all_docs.get("ids", [])]
+            embeddings = all_docs.get("embeddings")
+
+        index = ExactDenseIndex.build(ids, embeddings, dtype=settings.dense_index_dtype, version=version)
+        index.save(dense_dir)
+        logger.info(f"Exact dense index exported from ChromaDB records ({len(index)} vectors).")
+        return ExactDenseIndex.load(dense_dir)
+
+    def _row_map(self, ids: List[str]) -> np.ndarray:
+        """Chunk-store row of every index row (-1 for ids the chunk store does not know)."""
+        rows = [self.chunk_store.row_of(chunk_id) for chunk_id in ids]
+        return np.asarray([-1 if row is None else row for row in rows], dtype=np.int64)
+
+    @staticmethod
+    def _filter_key(filters: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((field, tuple(value) if isinstance(value, list) else value) for field, value in filters.items()))
+
+    @staticmethod
+    def _chroma_where(filters: Dict[str, Any]) -> Dict[str, Any]:
+        clauses = [
+            {field: {"$in": list(value)} if isinstance(value, list) else {"$eq": value}}
+            for field, value in filters.items()
+        ]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Chunk-store row mask for `filters`, or None when nothing is filtered."""
+        if not filters:
+            return None
+        key = (read_index_version(), self._filter_key(filters))
+        mask = self.filter_cache.get(key)
+        if mask is None:
+            mask = self.chunk_store.filter_mask(filters)
+            self.filter_cache.set(key, mask)
+        return mask
 
-    def search_vector(self, query: str) -> List[Dict[str, Any]]:
+    def _index_rows(self, filters: Optional[Dict[str, Any]], index: str, row_map: np.ndarray) -> Optional[np.ndarray]:
+        """Sorted rows of one index whose chunks match `filters`, so the index scores only those."""
+        if not filters:
+            return None
+        key = (read_index_version(), index, self._filter_key(filters))
+        rows = self.filter_cache.get(key)
+        if rows is None:
+            # Row -1 (unknown to the chunk store) picks the appended False
+            rows = np.flatnonzero(np.append(self.filter_mask(filters), False)[row_map])
+            self.filter_cache.set(key, rows)
+        return rows
+
+    def filter_selectivity(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """How much of the corpus `filters` leaves searchable, for tracing."""
+        total = len(self.chunk_store)
+        mask = self.filter_mask(filters)
+        matched = total if mask is None else int(np.count_nonzero(mask))
+        return {"matched": matched, "total": total, "selectivity": round(matched / total, 4) if total else 0.0}
+
+    def _encode(self, queries: List[str]) -> List[List[float]]:
+        vectors = self.embedding_model.encode(queries, batch_size=settings.embed_max_batch_size)
+        return [vector.tolist() for vector in vectors]
+
+    def _lookup_embeddings(self, queries: List[str]) -> Tuple[List[Tuple], List[Optional[List[float]]], List[int]]:
+        """Split queries into cached embeddings and the indices that still need encoding."""
+        version = read_index_version()
+        keys = [(model_cache_name(settings.embedding_model), version, normalize_query(q)) for q in queries]
+        results = [self.embedding_cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        return keys, results, missing
+
+    def _store_embeddings(self, keys, results, missing, vectors) -> List[List[float]]:
+        for i, vector in zip(missing, vectors):
+            results[i] = vector
+            self.embedding_cache.set(keys[i], vector)
+        return results
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Encode a list of queries in a single model call (cache hits are skipped)."""
+        keys, results, missing = self._lookup_embeddings(queries)
+        vectors = self._encode([queries[i] for i in missing]) if missing else []
+        return self._store_embeddings(keys, results, missing, vectors)
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Encode queries through the shared batching queue (single queries or whole lists)."""
+        keys, results, missing = self._lookup_embeddings(queries)
+        vectors = await self.embed_batcher.submit([queries[i] for i in missing]) if missing else []
+        return self._store_embeddings(keys, results, missing, vectors)
+
+    def search_vector(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Vector similarity search (dense)"""
-        if not self.collection:
+        if self.dense_index is None and not self.collection:
             return []
             
-        vector = self.embedding_model.encode([query])[0].tolist()
+        return self.search_vector_by_embedding(self.embed_queries([query])[0], filters)
+
+    def search_vector_by_embedding(
+        self, vector: List[float], filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Vector similarity search (dense) for an already encoded query."""
+        return self.search_vector_batch([vector], filters, top_k)[0]
+
+    def search_vector_batch(
+        self, vectors: List[List[float]], filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Vector similarity search for many encoded queries in a single index query."""
+        if self.dense_index is not None:
+            return self._search_dense_index(vectors, filters, top_k)
+
+        if not self.collection or not vectors:
+            return [[] for _ in vectors]
+
+        n_results, where = top_k or settings.top_k_vector, None
+        if filters:
+            # Chroma applies the where clause before the ANN search; never ask for more hits than can match
+            matched = int(np.count_nonzero(self.filter_mask(filters)))
+            if matched == 0:
+                return [[] for _ in vectors]
+            n_results, where = min(n_results, matched), self._chroma_where(filters)
+            
+        # Ids and distances only; text/metadata are hydrated from the chunk store after fusion
         results = self.collection.query(
-            query_embeddings=[vector],
-            n_results=settings.top_k_vector
+            query_embeddings=vectors,
+            n_results=n_results,
+            where=where,
+            include=["distances"]
         )
         
-        formatted_results = []
-        for ids, dists, docs, metas in zip(results.get("ids", []), results.get("distances", []), results.get("documents", []), results.get("metadatas", [])):
+        batch_results = []
+        for ids, dists in zip(results.get("ids", []), results.get("distances", [])):
+            formatted_results = []
             for i in range(len(ids)):
                 formatted_results.append({
                     "id": ids[i],
-                    "text": docs[i],
-                    "metadata": metas[i],
                     "distance": dists[i]
                 })
-        return formatted_results
+            batch_results.append(formatted_results)
+        return batch_results
 
-    def search_bm25(self, query: str) -> List[Dict[str, Any]]:
-        """Lexical search using BM25 via Whoosh"""
-        formatted_results = []
-        with self.ix.searcher() as searcher:
-            q = QueryParser("content", self.ix.schema).parse(query)
-            results = searcher.search(q, limit=settings.top_k_bm25)
+    def _search_dense_index(
+        self, vectors: List[List[float]], filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Exact search against the memory-mapped matrix (distance = cosine distance, like Chroma)."""
+        if not vectors:
+            return []
             
-            for rank, r in enumerate(results):
-                formatted_results.append({
-                    "id": r["doc_id"],
-                    "text": r["content"],
-                    "score": r.score,
-                    "bm25_rank": rank
-                })
-        return formatted_results
+        batch_results = []
+        rows = self._index_rows(filters, "dense", self._dense_rows)
+        for hits in self.dense_index.search(vectors, top_k or settings.top_k_vector, rows=rows):
+            batch_results.append([
+                {
+                    "id": self.dense_index.ids[i],
+                    "distance": 1.0 - similarity
+                }
+                for i, similarity in hits
+            ])
+        return batch_results
+
+    def search_bm25(self, query: str, filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lexical search using the in-memory BM25 index"""
+        top_k = top_k or settings.top_k_bm25
+        filter_key = self._filter_key(filters) if filters else ()
+        cache_key = (read_index_version(), top_k, filter_key, normalize_query(query))
+        cached = self.bm25_cache.get(cache_key)
+        if cached is not None:
+            return [dict(r) for r in cached]
+
+        formatted_results = []
+        for rank, (doc_idx, score) in enumerate(self.bm25.search(query, top_k, rows=self._index_rows(filters, "bm25", self._bm25_rows))):
+            formatted_results.append({
+                "id": self.bm25.ids[doc_idx],
+                "score": score,
+                "bm25_rank": rank
+            })
+        self.bm25_cache.set(cache_key, formatted_results)
+        return [dict(r) for r in formatted_results]
@@ -0,0 +1 @@
+"""Offline benchmarks and evaluation reports for the serving pipeline."""
@@ -0,0 +1,141 @@
+"""
+BM25 Benchmark — in-memory vectorized index vs Whoosh.
+
+Builds both indexes over a synthetic Zipf-distributed corpus and measures build time,
+index size and per-query latency (p50/p95) at several corpus sizes. Whoosh runs at every size
+by default, including 1M chunks, where its build alone takes a long time; --whoosh-max-docs
+caps it for quicker runs (larger sizes are then reported as "skipped").
+
+Usage (from backend/):
+  python -m benchmarks.bench_bm25
+  python -m benchmarks.bench_bm25 --sizes 10000 100000 1000000 --whoosh-max-docs 100000
+  python -m benchmarks.bench_bm25 --output data/benchmarks/bm25.json
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.db.bm25_index import BM25Index
+from benchmarks.common import percentiles, write_results
+
+
+def _make_vocab(size: int, rng: np.random.Generator) -> list[str]:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 10, size=size)
+    words = {"".join(rng.choice(letters, size=n)) for n in lengths}
+    return sorted(words)
+
+
+def make_corpus(n_docs: int, doc_tokens: int, vocab: list[str], seed: int = 7) -> list[str]:
+    """Synthetic documents whose term frequencies follow a Zipf law, like natural text."""
+    rng = np.random.default_rng(seed)
+    vocab_arr = np.array(vocab)
+    docs = []
+    for _ in range(n_docs):
+        ids = np.minimum(rng.zipf(1.2, size=doc_tokens), len(vocab)) - 1
+        docs.append(" ".join(vocab_arr[ids]))
+    return docs
+
+
+def make_queries(n_queries: int, vocab: list[str], seed: int = 11) -> list[str]:
+    rng = np.random.default_rng(seed)
+    # Mid-frequency terms, like the content words of a real question
+    return [" ".join(rng.choice(vocab[50:5000], size=6)) for _ in range(n_queries)]
+
+
+def _dir_size_mb(path: Path) -> float:
+    return round(sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1e6, 2)
+
+
+def bench_memory_index(ids: list[str], docs: list[str], queries: list[str], top_k: int, workdir: Path) -> dict[str, Any]:
+    start = time.perf_counter()
+    BM25Index.build(ids, docs).save(workdir / "bm25")
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = BM25Index.load(workdir / "bm25")
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {"build_s": round(build_s, 2), "load_s": round(load_s, 3), "size_mb": _dir_size_mb(workdir / "bm25"), **percentiles(latencies, mean=True, digits=3)}
+
+
+def bench_whoosh(ids: list[str], docs: list[str], queries: list[str], top_k: int, workdir: Path) -> dict[str, Any]:
+    from whoosh.fields import ID, TEXT, Schema
+    from whoosh.index import create_in
+    from whoosh.qparser import OrGroup, QueryParser
+
+    index_dir = workdir / "whoosh"
+    index_dir.mkdir()
+    schema = Schema(doc_id=ID(stored=True, unique=True), content=TEXT(stored=True))
+
+    start = time.perf_counter()
+    ix = create_in(str(index_dir), schema)
+    writer = ix.writer()
+    for doc_id, text in zip(ids, docs):
+        writer.add_document(doc_id=doc_id, content=text)
+    writer.commit()
+    build_s = time.perf_counter() - start
+
+    # Mirror the old serving path: new searcher + query parse per request
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        with ix.searcher() as searcher:
+            parsed = QueryParser("content", ix.schema, group=OrGroup).parse(q)
+            [r["doc_id"] for r in searcher.search(parsed, limit=top_k)]
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {"build_s": round(build_s, 2), "size_mb": _dir_size_mb(index_dir), **percentiles(latencies, mean=True, digits=3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory BM25 index against Whoosh")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--doc-tokens", type=int, default=120, help="Tokens per synthetic chunk")
+    parser.add_argument("--vocab-size", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--whoosh-max-docs", type=int, default=None, help="Skip Whoosh above this size (its 1M build is very slow)")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    vocab = _make_vocab(args.vocab_size, np.random.default_rng(3))
+    queries = make_queries(args.queries, vocab)
+    results: list[dict[str, Any]] = []
+
+    for n_docs in args.sizes:
+        print(f"\n── {n_docs:,} chunks ──")
+        docs = make_corpus(n_docs, args.doc_tokens, vocab)
+        ids = [f"chunk_{i:07d}" for i in range(n_docs)]
+        workdir = Path(tempfile.mkdtemp(prefix="bench_bm25_"))
+        try:
+            row: dict[str, Any] = {"n_docs": n_docs, "memory": bench_memory_index(ids, docs, queries, args.top_k, workdir)}
+            print(f"  memory : {row['memory']}")
+            if args.whoosh_max_docs is None or n_docs <= args.whoosh_max_docs:
+                row["whoosh"] = bench_whoosh(ids, docs, queries, args.top_k, workdir)
+                row["speedup_p50"] = round(row["whoosh"]["p50_ms"] / max(row["memory"]["p50_ms"], 1e-6), 1)
+                print(f"  whoosh : {row['whoosh']}")
+                print(f"  speedup (p50): {row['speedup_p50']}x")
+            else:
+                row["whoosh"] = "skipped"
+            results.append(row)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
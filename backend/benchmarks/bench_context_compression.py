@@ -0,0 +1,115 @@
+"""
+Context Compression Benchmark — prompt tokens and time-to-first-token, before vs after.
+
+Retrieves and reranks every question in data/eval_qa.json, then builds the LLM prompt from the full
+top-k chunks and from the compressed chunks at each token budget. Reports prompt tokens
+(tiktoken cl100k_base over the system + user messages), compression time and, with --ttft,
+the time to the first streamed token from Groq (needs GROQ_API_KEY).
+
+Usage (from backend/):
+  python -m benchmarks.bench_context_compression
+  python -m benchmarks.bench_context_compression --budgets 600 900 1200 --ttft
+  python -m benchmarks.bench_context_compression --output data/benchmarks/compression.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from app.core.config import settings
+from app.services.context_compressor import ContextCompressor, count_tokens
+from app.services.fusion import reciprocal_rank_fusion
+from app.services.llm_service import LLMService
+from app.services.reranker_service import RerankerService
+from app.services.retrieval_service import RetrievalService
+from benchmarks.common import write_results
+
+
+def _summary(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean": round(statistics.fmean(ordered), 1),
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+    }
+
+
+def prompt_tokens(llm: LLMService, query: str, chunks: list[dict[str, Any]]) -> int:
+    return sum(count_tokens(m["content"]) for m in llm._build_messages(query, chunks))
+
+
+async def time_to_first_token(llm: LLMService, query: str, chunks: list[dict[str, Any]]) -> Optional[float]:
+    start = time.perf_counter()
+    async for _ in llm.astream_answer(query, chunks):
+        return (time.perf_counter() - start) * 1000
+    return None
+
+
+def measure(
+    llm: LLMService,
+    queries: list[str],
+    contexts: list[list[dict[str, Any]]],
+    ttft: bool,
+) -> dict[str, Any]:
+    row: dict[str, Any] = {"prompt_tokens": _summary([prompt_tokens(llm, q, c) for q, c in zip(queries, contexts)])}
+    if ttft:
+        samples = [asyncio.run(time_to_first_token(llm, q, c)) for q, c in zip(queries, contexts)]
+        row["ttft_ms"] = _summary([s for s in samples if s is not None])
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure prompt size and TTFT with and without context compression")
+    parser.add_argument("--eval-file", type=str, default="data/eval_qa.json")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[600, 900, settings.context_token_budget])
+    parser.add_argument("--ttft", action="store_true", help="Also stream from Groq and time the first token")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not Path(args.eval_file).exists():
+        print(f"{args.eval_file} not found. Generate it first.")
+        return
+    with open(args.eval_file, "r", encoding="utf-8") as f:
+        qa_data = json.load(f)
+    queries = [item["question"] for item in qa_data]
+
+    retriever = RetrievalService()
+    reranker = RerankerService(chunk_store=retriever.chunk_store)
+    llm = LLMService()
+    llm.response_cache = None  # TTFT must come from Groq, not a replayed answer
+
+    vectors = retriever.embed_queries(queries)
+    hybrid_batches = [
+        reciprocal_rank_fusion(vector_results, retriever.search_bm25(query), chunk_store=retriever.chunk_store)
+        for query, vector_results in zip(queries, retriever.search_vector_batch(vectors))
+    ]
+    top_chunk_batches = reranker.score_and_rank_batch(queries, hybrid_batches)
+
+    print(f"Evaluating {len(queries)} queries")
+    results: dict[str, Any] = {"full": measure(llm, queries, top_chunk_batches, args.ttft), "compressed": []}
+    print(f"  full           : {results['full']}")
+
+    for budget in args.budgets:
+        compressor = ContextCompressor(retriever.embedding_model, token_budget=budget)
+        compressed, timings = [], []
+        for query, vector, chunks in zip(queries, vectors, top_chunk_batches):
+            start = time.perf_counter()
+            compressed.append(compressor.compress(query, chunks, vector)[0])
+            timings.append((time.perf_counter() - start) * 1000)
+        row = {"budget": budget, "compress_ms": _summary(timings), **measure(llm, queries, compressed, args.ttft)}
+        row["prompt_token_reduction"] = round(1 - row["prompt_tokens"]["mean"] / results["full"]["prompt_tokens"]["mean"], 3)
+        results["compressed"].append(row)
+        print(f"  budget={budget:<6}: {row}")
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
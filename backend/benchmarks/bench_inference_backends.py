@@ -0,0 +1,124 @@
+"""
+Inference Backend Benchmark — parity and latency of torch / onnx / onnx-int8.
+
+Loads the embedding model and the reranker through app.services.model_loader for each backend,
+then compares against PyTorch fp32 on the questions and contexts of data/eval_qa.json:
+  - embedding parity: cosine similarity between backend and torch vectors (min / mean)
+  - reranker parity: absolute score deviation (max / mean) and top-k agreement
+  - latency: single-query encode and one rerank call over top_k_fusion pairs (p50/p95)
+Exits non-zero when a backend drifts past the tolerances, so it can gate a backend switch.
+
+Usage (from backend/):
+  python -m benchmarks.bench_inference_backends
+  python -m benchmarks.bench_inference_backends --backends torch onnx-int8 --min-cosine 0.99
+  python -m benchmarks.bench_inference_backends --output data/benchmarks/backends.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.model_loader import INFERENCE_BACKENDS, load_cross_encoder, load_embedding_model
+from benchmarks.common import percentiles, write_results
+
+
+def _timed(fn, repeats: int) -> list[float]:
+    fn()  # first call pays session / graph initialisation
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_backend(backend: str, queries: list[str], passages: list[str], repeats: int) -> dict[str, Any]:
+    start = time.perf_counter()
+    embedder = load_embedding_model(backend=backend)
+    reranker = load_cross_encoder(settings.reranker_model, max_length=512, backend=backend)
+    load_s = time.perf_counter() - start
+
+    vectors = embedder.encode(queries + passages, normalize_embeddings=True)
+    pairs_per_query = [[[q, p] for p in passages[:settings.top_k_fusion]] for q in queries]
+    scores = np.asarray([reranker.predict(pairs) for pairs in pairs_per_query], dtype=np.float32)
+
+    embed_ms = _timed(lambda: embedder.encode(queries[0]), repeats)
+    rerank_ms = _timed(lambda: reranker.predict(pairs_per_query[0]), repeats)
+    return {
+        "load_s": round(load_s, 2),
+        "embed_query": percentiles(embed_ms),
+        f"rerank_{settings.top_k_fusion}_pairs": percentiles(rerank_ms),
+        "_vectors": vectors,
+        "_scores": scores,
+    }
+
+
+def parity(reference: dict[str, Any], candidate: dict[str, Any]) -> dict[str, float]:
+    cosines = np.sum(reference["_vectors"] * candidate["_vectors"], axis=1)
+    deviation = np.abs(reference["_scores"] - candidate["_scores"])
+    k = settings.top_k_rerank
+    ref_top = np.argsort(-reference["_scores"], axis=1)[:, :k]
+    cand_top = np.argsort(-candidate["_scores"], axis=1)[:, :k]
+    agreement = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+    return {
+        "embedding_cosine_min": round(float(cosines.min()), 5),
+        "embedding_cosine_mean": round(float(cosines.mean()), 5),
+        "rerank_abs_dev_max": round(float(deviation.max()), 4),
+        "rerank_abs_dev_mean": round(float(deviation.mean()), 4),
+        f"rerank_top{k}_agreement": round(statistics.fmean(agreement), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare inference backends for parity and latency")
+    parser.add_argument("--backends", nargs="+", choices=INFERENCE_BACKENDS, default=list(INFERENCE_BACKENDS))
+    parser.add_argument("--eval-file", type=str, default="data/eval_qa.json")
+    parser.add_argument("--repeats", type=int, default=50, help="Timed calls per measurement")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail if any embedding drifts below this cosine vs torch")
+    parser.add_argument("--max-score-dev", type=float, default=0.25, help="Fail if any reranker score deviates more than this from torch")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not Path(args.eval_file).exists():
+        print(f"{args.eval_file} not found. Generate it first.")
+        return
+    with open(args.eval_file, "r", encoding="utf-8") as f:
+        qa_data = json.load(f)
+    queries = [item["question"] for item in qa_data]
+    passages = [item["ground_truth_context"] for item in qa_data]
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    runs = {}
+    for backend in backends:
+        print(f"\n── {backend} ──")
+        runs[backend] = run_backend(backend, queries, passages, args.repeats)
+        print(f"  latency: { {k: v for k, v in runs[backend].items() if not k.startswith('_')} }")
+
+    results: dict[str, Any] = {}
+    failed = False
+    for backend, run in runs.items():
+        row = {k: v for k, v in run.items() if not k.startswith("_")}
+        if backend != "torch":
+            row["parity"] = parity(runs["torch"], run)
+            row["parity_ok"] = (
+                row["parity"]["embedding_cosine_min"] >= args.min_cosine
+                and row["parity"]["rerank_abs_dev_max"] <= args.max_score_dev
+            )
+            failed = failed or not row["parity_ok"]
+            print(f"  {backend} parity vs torch: {row['parity']} -> {'OK' if row['parity_ok'] else 'FAIL'}")
+        results[backend] = row
+
+    write_results(args.output, results)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
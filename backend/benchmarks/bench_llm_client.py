@@ -0,0 +1,89 @@
+"""
+LLM Client Benchmark — tail latency and error rate against a misbehaving upstream.
+
+Starts benchmarks/stub_llm_server.py in-process (or targets --base-url) and fires --requests
+non-streaming completions through ResilientLLMClient with --concurrency in flight, once per
+configuration: no retries, retries, and retries + hedging. Reports p50/p95/p99 latency, error rate
+and the client's retry / timeout / hedge counters.
+
+Usage (from backend/):
+  python -m benchmarks.bench_llm_client
+  python -m benchmarks.bench_llm_client --slow-rate 0.05 --slow-ms 3000 --fail-rate 0.05 --rate-limit-rate 0.02
+  python -m benchmarks.bench_llm_client --base-url http://127.0.0.1:8900 --output data/benchmarks/llm_client.json
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from app.core.config import settings
+from app.services.llm_client import ResilientLLMClient
+from benchmarks.common import percentiles, write_results
+from benchmarks.stub_llm_server import build_parser as build_stub_parser, serve_in_background
+
+CONFIGS = {
+    "no_retries": {"llm_max_retries": 0, "llm_hedge_enabled": False},
+    "retries": {"llm_max_retries": 2, "llm_hedge_enabled": False},
+    "retries_hedged": {"llm_max_retries": 2, "llm_hedge_enabled": True},
+}
+
+
+async def run_config(base_url: str, requests: int, concurrency: int, deadline: float) -> dict[str, Any]:
+    client = ResilientLLMClient(api_key="stub", base_url=base_url)
+    gate = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def one(i: int) -> None:
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await client.acreate(
+                    timeout=deadline,
+                    model=settings.llm_model,
+                    messages=[{"role": "user", "content": f"benchmark question {i}"}],
+                    temperature=settings.temperature,
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors.append(type(e).__name__)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return {
+        **percentiles(latencies, quantiles=(0.5, 0.95, 0.99), digits=1),
+        "error_rate": round(len(errors) / requests, 4),
+        "errors": {name: errors.count(name) for name in set(errors)},
+        "client": client.stats.snapshot(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tail latency of the LLM client against the stub upstream", parents=[build_stub_parser()], conflict_handler="resolve")
+    parser.add_argument("--base-url", type=str, default=None, help="Use an already running stub / upstream instead")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8, help="Keep below LLM_MAX_CONCURRENCY so hedges find a free slot")
+    parser.add_argument("--deadline", type=float, default=10.0, help="Per-call deadline in seconds")
+    parser.add_argument("--configs", type=str, nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    base_url = args.base_url or serve_in_background(args)
+    print(f"Upstream: {base_url}, {args.requests} requests, concurrency {args.concurrency}")
+
+    results: dict[str, Any] = {}
+    for name in args.configs:
+        for key, value in CONFIGS[name].items():
+            setattr(settings, key, value)
+        results[name] = asyncio.run(run_config(base_url, args.requests, args.concurrency, args.deadline))
+        print(f"  {name:<15}: { {k: v for k, v in results[name].items() if k != 'client'} }")
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Shared helpers for the benchmark scripts: latency percentiles and the `--output` JSON writer.
+"""
+import json
+import statistics
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+
+def percentiles(
+    samples_ms: Sequence[float],
+    quantiles: Sequence[float] = (0.5, 0.95),
+    mean: bool = False,
+    digits: int = 2,
+) -> dict[str, Optional[float]]:
+    """`p50_ms`, `p95_ms`, ... (plus `mean_ms` when asked); all None when there are no samples."""
+    keys = [f"p{round(q * 100)}_ms" for q in quantiles] + (["mean_ms"] if mean else [])
+    if not samples_ms:
+        return dict.fromkeys(keys)
+    ordered = sorted(samples_ms)
+    values = [statistics.median(ordered) if q == 0.5 else ordered[int(q * (len(ordered) - 1))] for q in quantiles]
+    if mean:
+        values.append(statistics.fmean(ordered))
+    return {key: round(value, digits) for key, value in zip(keys, values)}
+
+
+def write_results(path: Optional[str], results: Any) -> None:
+    """Dump `results` as JSON to `path` (the scripts' `--output`); does nothing when it is unset."""
+    if not path:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {path}")
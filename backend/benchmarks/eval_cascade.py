@@ -0,0 +1,131 @@
+"""
+Cascade Reranking Eval — recall@k vs latency.
+
+Retrieves and fuses candidates for every question in data/eval_qa.json once, then reranks them
+with the single heavy cross-encoder and with the cascade at each (first-stage keep, early-exit
+margin) combination. Reports recall@k against the ground-truth document, overlap with the
+single-model top k, heavy-model pairs scored and per-query rerank latency (p50/p95).
+The score cache is disabled so every run pays for its model calls.
+
+Usage (from backend/):
+  python -m benchmarks.eval_cascade
+  python -m benchmarks.eval_cascade --keep 5 8 10 --margins 0.1 0.25 0.5 --first-stage dense
+  python -m benchmarks.eval_cascade --output data/benchmarks/cascade.json
+"""
+
+import argparse
+import copy
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from app.core.config import settings
+from app.services.cache_service import RerankScoreCache
+from app.services.fusion import reciprocal_rank_fusion
+from app.services.reranker_service import RerankerService
+from app.services.retrieval_service import RetrievalService
+from benchmarks.common import percentiles, write_results
+
+
+def run_config(
+    reranker: RerankerService,
+    qa_data: list[dict[str, Any]],
+    candidates: list[list[dict[str, Any]]],
+    baseline: list[list[str]] | None,
+) -> tuple[dict[str, Any], list[list[str]]]:
+    predict = reranker._predict
+    heavy_pairs = 0
+
+    def counting_predict(pairs):
+        nonlocal heavy_pairs
+        heavy_pairs += len(pairs)
+        return predict(pairs)
+
+    reranker._predict = counting_predict
+    reranker.cascade_stats = {key: 0 for key in reranker.cascade_stats}
+    latencies, hits, overlaps, top_ids = [], [], [], []
+    try:
+        for idx, (item, docs) in enumerate(zip(qa_data, candidates)):
+            start = time.perf_counter()
+            top_chunks = reranker.score_and_rank(item["question"], copy.deepcopy(docs))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            retrieved_doc_ids = [str(c.get("metadata", {}).get("doc_id", "")) for c in top_chunks]
+            hits.append(1.0 if item["ground_truth_doc_id"] in retrieved_doc_ids else 0.0)
+            top_ids.append([c["id"] for c in top_chunks])
+            if baseline is not None and baseline[idx]:
+                overlaps.append(len(set(top_ids[-1]) & set(baseline[idx])) / len(baseline[idx]))
+    finally:
+        reranker._predict = predict
+
+    result = {
+        f"recall_at_{settings.top_k_rerank}": round(statistics.fmean(hits), 4),
+        "heavy_pairs_per_query": round(heavy_pairs / len(qa_data), 2),
+        **percentiles(latencies, mean=True),
+    }
+    if overlaps:
+        result["overlap_with_single"] = round(statistics.fmean(overlaps), 4)
+    if reranker.mode == "cascade":
+        result["early_exit_rate"] = round(reranker.cascade_stats["early_exits"] / max(reranker.cascade_stats["queries"], 1), 4)
+    return result, top_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report the recall@k vs latency tradeoff of cascaded reranking")
+    parser.add_argument("--eval-file", type=str, default="data/eval_qa.json")
+    parser.add_argument("--keep", type=int, nargs="+", default=[settings.top_k_rerank, 8, 10], help="First-stage keep budgets to sweep")
+    parser.add_argument("--margins", type=float, nargs="+", default=[float("inf"), 0.25, 0.1], help="Early-exit margins to sweep (inf disables early exit)")
+    parser.add_argument("--first-stage", choices=["cross-encoder", "dense"], default=settings.cascade_first_stage)
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the eval set per configuration")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not Path(args.eval_file).exists():
+        print(f"{args.eval_file} not found. Generate it first.")
+        return
+    with open(args.eval_file, "r", encoding="utf-8") as f:
+        qa_data = json.load(f)
+
+    settings.cascade_first_stage = args.first_stage
+    retriever = RetrievalService()
+    reranker = RerankerService(embedding_model=retriever.embedding_model, chunk_store=retriever.chunk_store)
+    reranker._ensure_first_stage()
+    reranker.score_cache = RerankScoreCache(model_name="eval", max_entries=0)
+
+    queries = [item["question"] for item in qa_data] * args.repeat
+    qa_data = qa_data * args.repeat
+    vector_batches = retriever.search_vector_batch(retriever.embed_queries(queries))
+    candidates = [
+        reciprocal_rank_fusion(vector_results, retriever.search_bm25(query), chunk_store=retriever.chunk_store)
+        for query, vector_results in zip(queries, vector_batches)
+    ]
+
+    # Untimed warm-up in cascade mode, so first-call setup of both stages is not measured
+    reranker.mode = "cascade"
+    reranker.score_and_rank(queries[0], copy.deepcopy(candidates[0]))
+
+    print(f"Evaluating {len(qa_data)} queries, {settings.top_k_fusion} fused candidates each, first stage: {args.first_stage}")
+    reranker.mode = "single"
+    single, baseline = run_config(reranker, qa_data, candidates, None)
+    results: list[dict[str, Any]] = [{"mode": "single", **single}]
+    print(f"  single                    : {single}")
+
+    reranker.mode = "cascade"
+    for keep in args.keep:
+        for margin in args.margins:
+            reranker.first_stage_keep = keep
+            reranker.early_exit_margin = margin
+            row, _ = run_config(reranker, qa_data, candidates, baseline)
+            results.append({"mode": "cascade", "first_stage": args.first_stage, "keep": keep, "margin": margin, **row})
+            print(f"  cascade keep={keep:<3} m={margin:<5}: {row}")
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Query Routing Eval — latency saved vs recall lost.
+
+Runs every question in data/eval_qa.json through the always-hybrid plan and through the plan the
+heuristic QueryRouter picks, executing the same retrieval -> fusion -> rerank steps as /chat.
+Reports, per strategy: recall@k after reranking, candidate recall (ground-truth document anywhere
+in the fused candidates), candidates reranked, and retrieval / rerank / total latency (p50/p95).
+Query caches are disabled so each run pays for its own encoding, search and scoring.
+
+Usage (from backend/):
+  python -m benchmarks.eval_routing
+  python -m benchmarks.eval_routing --depth 5 8 10 --output data/benchmarks/routing.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+from app.core.config import settings
+from app.services.cache_service import LRUCache, RerankScoreCache
+from app.services.fusion import reciprocal_rank_fusion
+from app.services.query_router import QueryRouter, RetrievalPlan
+from app.services.reranker_service import RerankerService
+from app.services.retrieval_service import RetrievalService
+from benchmarks.common import percentiles, write_results
+
+
+def _doc_ids(chunks: list[dict[str, Any]]) -> list[str]:
+    return [str(c.get("metadata", {}).get("doc_id", "")) for c in chunks]
+
+
+def run_plan(retriever: RetrievalService, reranker: RerankerService, query: str, plan: RetrievalPlan) -> dict[str, Any]:
+    start = time.perf_counter()
+    vector_results = []
+    if plan.use_dense:
+        vector_results = retriever.search_vector_by_embedding(retriever.embed_queries([query])[0], top_k=plan.top_k_vector)
+    bm25_results = retriever.search_bm25(query, top_k=plan.top_k_bm25) if plan.use_sparse else []
+    candidates = reciprocal_rank_fusion(vector_results, bm25_results, chunk_store=retriever.chunk_store, top_k=plan.top_k_fusion)
+    retrieval_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    top_chunks = reranker.score_and_rank(query, candidates)
+    rerank_ms = (time.perf_counter() - start) * 1000
+    return {"candidates": candidates, "top_chunks": top_chunks, "retrieval_ms": retrieval_ms, "rerank_ms": rerank_ms}
+
+
+def summarize(runs: list[dict[str, Any]], gt_doc_ids: list[str]) -> dict[str, Any]:
+    return {
+        f"recall_at_{settings.top_k_rerank}": round(statistics.fmean(gt in _doc_ids(r["top_chunks"]) for r, gt in zip(runs, gt_doc_ids)), 4),
+        "candidate_recall": round(statistics.fmean(gt in _doc_ids(r["candidates"]) for r, gt in zip(runs, gt_doc_ids)), 4),
+        "candidates_reranked": round(statistics.fmean(len(r["candidates"]) for r in runs), 2),
+        "retrieval": percentiles([r["retrieval_ms"] for r in runs]),
+        "rerank": percentiles([r["rerank_ms"] for r in runs]),
+        "total": percentiles([r["retrieval_ms"] + r["rerank_ms"] for r in runs]),
+    }
+
+
+def _disable_caches(retriever: RetrievalService, reranker: RerankerService) -> None:
+    retriever.embedding_cache = LRUCache(max_entries=0)
+    retriever.bm25_cache = LRUCache(max_entries=0)
+    reranker.score_cache = RerankScoreCache(model_name="eval", max_entries=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare routed retrieval plans against always-hybrid retrieval")
+    parser.add_argument("--eval-file", type=str, default="data/eval_qa.json")
+    parser.add_argument("--depth", type=int, nargs="+", default=[settings.router_single_path_depth], help="Single-path candidate depths to sweep")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the eval set per strategy")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not Path(args.eval_file).exists():
+        print(f"{args.eval_file} not found. Generate it first.")
+        return
+    with open(args.eval_file, "r", encoding="utf-8") as f:
+        qa_data = json.load(f) * args.repeat
+    queries = [item["question"] for item in qa_data]
+    gt_doc_ids = [item["ground_truth_doc_id"] for item in qa_data]
+
+    retriever = RetrievalService()
+    reranker = RerankerService(chunk_store=retriever.chunk_store)
+    _disable_caches(retriever, reranker)
+    router = QueryRouter(retriever.bm25, mode="heuristic")
+
+    # One untimed query so model loading and first-call setup stay out of the timings
+    run_plan(retriever, reranker, queries[0], RetrievalPlan.hybrid())
+
+    print(f"Evaluating {len(queries)} queries")
+    hybrid_runs = [run_plan(retriever, reranker, q, RetrievalPlan.hybrid()) for q in queries]
+    baseline = summarize(hybrid_runs, gt_doc_ids)
+    results: dict[str, Any] = {"hybrid": baseline, "routed": []}
+    print(f"  hybrid           : {baseline}")
+
+    for depth in args.depth:
+        settings.router_single_path_depth = depth
+        plans = [router.plan(q) for q in queries]
+        routed_runs = [run_plan(retriever, reranker, q, plan) for q, plan in zip(queries, plans)]
+        row = {
+            "depth": depth,
+            "plans": dict(Counter(plan.mode for plan in plans)),
+            **summarize(routed_runs, gt_doc_ids),
+        }
+        row["recall_lost"] = round(baseline[f"recall_at_{settings.top_k_rerank}"] - row[f"recall_at_{settings.top_k_rerank}"], 4)
+        row["p50_ms_saved"] = round(baseline["total"]["p50_ms"] - row["total"]["p50_ms"], 2)
+        row["per_query"] = [
+            {"question": q, "plan": plan.mode, "reason": plan.reason, "hit": gt in _doc_ids(r["top_chunks"])}
+            for q, plan, r, gt in zip(queries[:len(queries) // args.repeat], plans, routed_runs, gt_doc_ids)
+        ]
+        results["routed"].append(row)
+        print(f"  routed depth={depth:<3}: { {k: v for k, v in row.items() if k != 'per_query'} }")
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
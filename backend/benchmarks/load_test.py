@@ -0,0 +1,227 @@
+"""
+Load Test — throughput, tail latency per stage and saturation point of POST /api/v1/chat.
+
+Replays questions from data/eval_qa.json (or a query log) open-loop at each --rates step for
+--duration seconds, with at most --concurrency requests in flight. Latency is measured from each
+request's scheduled send time, so queueing in the client counts (no coordinated omission).
+Per-stage latencies come from the Server-Timing header /chat sends. Achieved throughput counts
+successful responses over the send window (the step duration, or longer when the concurrency limit
+delayed sends), so a slow final response shows up in latency rather than in throughput.
+
+Groq is replaced by benchmarks/stub_llm_server.py (seeded, --latency-ms / --jitter-ms), started on
+a background thread. By default the app runs in-process over an ASGI transport with the answer
+and LLM response caches off, so every request runs the full pipeline. With --url the harness
+targets a running server instead; start that server with GROQ_BASE_URL pointing at the stub.
+
+The saturation point is the first rate at which achieved throughput falls below 90% of the
+offered rate, the error rate exceeds --max-error-rate, or p95 exceeds --slo-p95-ms.
+
+Usage (from backend/):
+  python -m benchmarks.load_test
+  python -m benchmarks.load_test --rates 1 2 4 8 16 --duration 20 --concurrency 32 --output data/benchmarks/load.json
+  python -m benchmarks.load_test --query-log data/query_log.jsonl --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+from app.core.config import settings
+from benchmarks.common import percentiles, write_results
+from benchmarks.stub_llm_server import build_parser as build_stub_parser, serve_in_background
+
+CHAT_PATH = "/api/v1/chat"
+
+
+def load_queries(eval_file: str, query_log: Optional[str]) -> list[str]:
+    """Questions from the eval set, or from a log with one query per line (plain text or JSON with "query")."""
+    if query_log is None:
+        with open(eval_file, "r", encoding="utf-8") as f:
+            return [item["question"] for item in json.load(f)]
+    queries = []
+    with open(query_log, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("query") or record.get("question") or ""
+            if line:
+                queries.append(line)
+    return queries
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """`embed;dur=12.5, rerank;dur=80.1` -> {"embed": 12.5, "rerank": 80.1}."""
+    stages = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                stages[name] = float(value)
+    return stages
+
+
+async def run_step(client: httpx.AsyncClient, queries: list[str], rate: float, duration: float, concurrency: int, timeout: float) -> dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    gate = asyncio.Semaphore(concurrency)
+    samples: list[dict[str, Any]] = []
+    total = max(1, int(rate * duration))
+    start = loop.time()
+
+    async def one(i: int) -> None:
+        scheduled = start + i / rate
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        async with gate:
+            sample: dict[str, Any] = {"sent": loop.time()}
+            try:
+                response = await client.post(
+                    CHAT_PATH,
+                    json={"user_id": "load-test", "query": queries[i % len(queries)]},
+                    timeout=timeout,
+                )
+                sample["status"] = response.status_code
+                sample["stages"] = parse_server_timing(response.headers.get("server-timing", ""))
+            except Exception as e:
+                sample["status"] = type(e).__name__
+            sample["latency_ms"] = (loop.time() - scheduled) * 1000
+        samples.append(sample)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    # Throughput over the send window: the tail of the last responses is latency, not lost
+    # throughput, but sends delayed past the schedule by a full --concurrency gate stretch it
+    send_window = max(duration, max(s["sent"] for s in samples) - start)
+
+    ok = [s for s in samples if s["status"] == 200]
+    stage_names = sorted({name for s in ok for name in s["stages"]})
+    return {
+        "offered_rps": rate,
+        "achieved_rps": round(len(ok) / send_window, 2),
+        "send_window_s": round(send_window, 2),
+        "requests": total,
+        "error_rate": round(1 - len(ok) / total, 4),
+        "statuses": dict(Counter(str(s["status"]) for s in samples)),
+        "latency": percentiles([s["latency_ms"] for s in ok], quantiles=(0.5, 0.95, 0.99), digits=1),
+        "stages": {name: percentiles([s["stages"][name] for s in ok if name in s["stages"]], quantiles=(0.5, 0.95, 0.99), digits=1) for name in stage_names},
+    }
+
+
+def is_saturated(step: dict[str, Any], slo_p95_ms: float, max_error_rate: float) -> bool:
+    p95 = step["latency"]["p95_ms"]
+    return (
+        step["achieved_rps"] < 0.9 * step["offered_rps"]
+        or step["error_rate"] > max_error_rate
+        or p95 is None
+        or p95 > slo_p95_ms
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/v1/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(1.0)
+    raise TimeoutError("Server did not become ready")
+
+
+async def run(args: argparse.Namespace, queries: list[str]) -> dict[str, Any]:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test")
+
+    results: dict[str, Any] = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("host", "port")},
+        "steps": [],
+        "saturation_rps": None,
+        "max_sustained_rps": None,
+    }
+    async with client:
+        if args.url:
+            await wait_until_ready(client, args.timeout)
+        # Warm every path (and the stub connection pool) outside the measured steps
+        await client.post(CHAT_PATH, json={"user_id": "load-test", "query": queries[0]}, timeout=args.timeout)
+        for rate in args.rates:
+            step = await run_step(client, queries, rate, args.duration, args.concurrency, args.timeout)
+            step["saturated"] = is_saturated(step, args.slo_p95_ms, args.max_error_rate)
+            results["steps"].append(step)
+            print(f"  rate={rate:<6} achieved={step['achieved_rps']:<7} errors={step['error_rate']:<7} latency={step['latency']}")
+            if not step["saturated"] and results["saturation_rps"] is None:
+                results["max_sustained_rps"] = rate
+            elif step["saturated"] and results["saturation_rps"] is None:
+                results["saturation_rps"] = rate
+                if not args.keep_going:
+                    break
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test /api/v1/chat against a stubbed LLM", parents=[build_stub_parser()], conflict_handler="resolve")
+    parser.add_argument("--eval-file", type=str, default="data/eval_qa.json")
+    parser.add_argument("--query-log", type=str, default=None, help="Replay these queries instead (text or JSONL, one per line)")
+    parser.add_argument("--url", type=str, default=None, help="Target a running server instead of the in-process app")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8, 16], help="Offered requests/second per step")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per rate step")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max requests in flight")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--slo-p95-ms", type=float, default=5000.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--keep-caches", action="store_true", help="Leave the answer / LLM response caches on (in-process)")
+    parser.add_argument("--keep-going", action="store_true", help="Run every rate even after saturation")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this path")
+    parser.set_defaults(seed=0, jitter_ms=0.0)
+    args = parser.parse_args()
+
+    source = args.query_log or args.eval_file
+    if not Path(source).exists():
+        print(f"{source} not found.")
+        return
+    queries = load_queries(args.eval_file, args.query_log)
+
+    stub_url = serve_in_background(args)
+    print(f"Stub LLM at {stub_url} ({args.latency_ms} ms + up to {args.jitter_ms} ms jitter)")
+
+    registry = None
+    if args.url:
+        print(f"Target: {args.url} (start it with GROQ_BASE_URL={stub_url})")
+    else:
+        settings.groq_base_url = stub_url
+        settings.groq_api_key = settings.groq_api_key or "stub"
+        if not args.keep_caches:
+            settings.answer_cache_enabled = False
+            settings.llm_cache_enabled = False
+        # ASGITransport does not run the lifespan, so load the shared services here
+        from app.core.registry import registry
+
+        registry.load()
+        print("Target: in-process app")
+
+    print(f"Replaying {len(queries)} queries")
+    try:
+        results = asyncio.run(run(args, queries))
+    finally:
+        if registry is not None:
+            registry.shutdown()
+
+    print(f"Saturation point: {results['saturation_rps'] or 'not reached'} req/s (max sustained: {results['max_sustained_rps']} req/s)")
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Stub LLM Server — a local stand-in for Groq's chat completions endpoint.
+
+Serves POST /openai/v1/chat/completions (streaming and non-streaming) with a canned answer and
+configurable upstream misbehaviour, so retries, deadlines, hedging and tail latency can be
+exercised offline. Point the API or a benchmark at it with GROQ_BASE_URL=http://127.0.0.1:8900.
+
+Per request, in order: with --rate-limit-rate return 429 (Retry-After: --retry-after), with
+--fail-rate return 500, otherwise answer after --latency-ms (+ uniform --jitter-ms), or after
+--slow-ms with probability --slow-rate. Streams send the answer word by word, --token-ms apart.
+
+Usage (from backend/):
+  python -m benchmarks.stub_llm_server
+  python -m benchmarks.stub_llm_server --latency-ms 300 --slow-rate 0.05 --slow-ms 4000 --fail-rate 0.02 --rate-limit-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_ANSWER = (
+    "Apex Global Bank offers this service to eligible customers. "
+    "**Key points:**\n- Fees and limits depend on your account type.\n"
+    "- Contact your branch for details specific to your account."
+)
+
+
+def create_stub_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    counters = {"requests": 0, "rate_limited": 0, "failed": 0, "slow": 0}
+    rng = random.Random(args.seed)  # own generator: same seed, same sequence of upstream behaviour
+
+    def _completion(model: str, content: str) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": len(content.split())},
+        }
+
+    def _chunk(completion_id: str, model: str, delta: Dict[str, str], finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        counters["requests"] += 1
+
+        if rng.random() < args.rate_limit_rate:
+            counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": str(args.retry_after)},
+            )
+        if rng.random() < args.fail_rate:
+            counters["failed"] += 1
+            return JSONResponse({"error": {"message": "Internal error (stub)", "type": "internal_error"}}, status_code=500)
+
+        latency_ms = args.latency_ms + rng.uniform(0, args.jitter_ms)
+        if rng.random() < args.slow_rate:
+            counters["slow"] += 1
+            latency_ms = args.slow_ms
+        await asyncio.sleep(latency_ms / 1000)
+
+        if not body.get("stream"):
+            return JSONResponse(_completion(model, STUB_ANSWER))
+
+        async def events():
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for word in STUB_ANSWER.split(" "):
+                await asyncio.sleep(args.token_ms / 1000)
+                yield _chunk(completion_id, model, {"content": word + " "})
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local stub of the Groq chat completions API")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Base time before the answer / first chunk")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform extra latency on top of the base")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests that take --slow-ms instead")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="Gap between streamed words")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def serve_in_background(args: argparse.Namespace, timeout: float = 10.0) -> str:
+    """Run the stub on a daemon thread (for benchmarks) and return its base URL once it accepts requests."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(args), host=args.host, port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not server.started:
+        # uvicorn logs the bind error and returns from run() when the port is taken
+        if not thread.is_alive():
+            raise RuntimeError(f"Stub LLM server could not start on {args.host}:{args.port} (port already in use?); pass --port")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Stub LLM server did not start on {args.host}:{args.port} within {timeout:.0f}s")
+        time.sleep(0.05)
+    return f"http://{args.host}:{args.port}"
+
+
+def main() -> None:
+    import uvicorn
+
+    args = build_parser().parse_args()
+    uvicorn.run(create_stub_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -71,7 +71,7 @@ def run_evaluation():
         qa_data = json.load(f)
         
     retriever = RetrievalService()
-    reranker = RerankerService()
+    reranker = RerankerService(chunk_store=retriever.chunk_store)
     llm = LLMService()
     
     metrics = {
@@ -83,18 +83,23 @@ def run_evaluation():
     
     print(f"Starting evaluation of {len(qa_data)} QA pairs...")
     
+    # 1. Retrieval for all questions at once (one encode, one Chroma query, one rerank predict)
+    queries = [item['question'] for item in qa_data]
+    vectors = retriever.embed_queries(queries)
+    vector_batches = retriever.search_vector_batch(vectors)
+    hybrid_batches = [
+        reciprocal_rank_fusion(vector_results, retriever.search_bm25(query), chunk_store=retriever.chunk_store)
+        for query, vector_results in zip(queries, vector_batches)
+    ]
+    top_chunk_batches = reranker.score_and_rank_batch(queries, hybrid_batches)
+    
     for idx, item in enumerate(qa_data):
         query = item['question']
         gt_doc_id = item['ground_truth_doc_id']
+        top_chunks = top_chunk_batches[idx]
         
         print(f"\n--- evaluating query {idx+1}/{len(qa_data)} ---")
         
-        # 1. Retrieval
-        vector_results = retriever.search_vector(query)
-        bm25_results = retriever.search_bm25(query)
-        hybrid_results = reciprocal_rank_fusion(vector_results, bm25_results)
-        top_chunks = reranker.score_and_rank(query, hybrid_results)
-        
         retrieved_doc_ids = [str(c.get("metadata", {}).get("doc_id", "")) for c in top_chunks]
         
         # calculate precision and recall @ K (assume k=len(top_chunks), usually 5 or 10)
@@ -3,6 +3,7 @@ Config adapter for Ingestion Pipeline to map the modern FastAPI Pydantic setting
 """
 from pathlib import Path
 from app.core.config import settings
+from app.core.utils import index_version_path
 
 # Ingestion explicitly mapped paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -19,6 +20,9 @@ EMBEDDED_DATA_PATH = PROCESSED_DIR / "embedded_data.json"
 # Chroma Config
 CHROMA_PERSIST_DIR = settings.chroma_persist_dir
 CHROMA_COLLECTION = settings.chroma_collection
+INDEX_VERSION_PATH = index_version_path()
+CHUNK_STORE_DIR = Path(settings.chunk_store_dir)
+RERANK_TOKEN_DIR = Path(settings.rerank_token_dir)
 EMBEDDING_DIM = 384
 
 # Chunking Config
@@ -27,6 +31,11 @@ CHUNK_OVERLAP_TOKENS = 80
 
 # Embedding Config
 EMBEDDING_MODEL = settings.embedding_model
+INFERENCE_BACKEND = settings.inference_backend
+
+# Reranker Config (chunk token ids are precomputed with its tokenizer)
+RERANKER_MODEL = settings.reranker_model
+RERANKER_MAX_LENGTH = 512
 
 # Metadata
 VERSION: str = "v1"
@@ -1,6 +1,7 @@
 """
 Step 4 — Embedding Generation Module
-Uses SentenceTransformers (all-MiniLM-L6-v2) to embed each chunk.
+Uses SentenceTransformers (all-MiniLM-L6-v2) to embed each chunk, on the same
+inference backend (torch / onnx / onnx-int8) that serving encodes queries with.
 """
 
 import json
@@ -9,7 +10,8 @@ from typing import Any
 
 from sentence_transformers import SentenceTransformer
 
-from ingestion.config import EMBEDDING_MODEL, EMBEDDED_DATA_PATH, PROCESSED_DIR
+from app.services.model_loader import load_embedding_model
+from ingestion.config import EMBEDDING_MODEL, EMBEDDED_DATA_PATH, INFERENCE_BACKEND, PROCESSED_DIR
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +23,8 @@ def _get_model() -> SentenceTransformer:
     """Load the embedding model (cached)."""
     global _model
     if _model is None:
-        logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
-        _model = SentenceTransformer(EMBEDDING_MODEL)
+        logger.info(f"Loading embedding model: {EMBEDDING_MODEL} ({INFERENCE_BACKEND})")
+        _model = load_embedding_model(EMBEDDING_MODEL, INFERENCE_BACKEND)
     return _model
 
 
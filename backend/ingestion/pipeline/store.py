@@ -4,15 +4,28 @@ Creates collection and inserts embeddings.
 Uses Chroma local persistent client.
 """
 
+import hashlib
+import json
 import logging
+from datetime import datetime, timezone
 from typing import Any
 
 import chromadb
 
+from app.db.chunk_store import ChunkStore
+from app.db.token_store import TokenStore
+from app.services.model_loader import model_cache_name
 from ingestion.config import (
     CHROMA_PERSIST_DIR,
     CHROMA_COLLECTION,
+    CHUNK_STORE_DIR,
     EMBEDDING_DIM,
+    EMBEDDING_MODEL,
+    INDEX_VERSION_PATH,
+    INFERENCE_BACKEND,
+    RERANK_TOKEN_DIR,
+    RERANKER_MAX_LENGTH,
+    RERANKER_MODEL,
 )
 
 logger = logging.getLogger(__name__)
@@ -25,6 +38,28 @@ def _get_client() -> chromadb.PersistentClient:
     return client
 
 
+def _compute_index_version(embedded_data: list[dict[str, Any]]) -> str:
+    """Content hash of the stored collection (embedding model + backend + chunk ids + texts)."""
+    h = hashlib.sha256(model_cache_name(EMBEDDING_MODEL, INFERENCE_BACKEND).encode("utf-8"))
+    for item in embedded_data:
+        h.update(item["metadata"]["chunk_id"].encode("utf-8"))
+        h.update(item["text"].encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _write_index_version(version: str, record_count: int) -> None:
+    """Publish the new version so serving-side caches invalidate themselves."""
+    INDEX_VERSION_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_VERSION_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": version,
+            "collection": CHROMA_COLLECTION,
+            "records": record_count,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }, f, indent=2)
+    logger.info(f"Wrote index version {version} to {INDEX_VERSION_PATH}")
+
+
 def store_in_chroma(embedded_data: list[dict[str, Any]]) -> int:
     """
     Store all embedded chunks in Chroma.
@@ -44,9 +79,10 @@ def store_in_chroma(embedded_data: list[dict[str, Any]]) -> int:
     except Exception:
         pass  # Collection doesn't exist
 
+    index_version = _compute_index_version(embedded_data)
     collection = client.create_collection(
         name=CHROMA_COLLECTION,
-        metadata={"hnsw:space": "cosine"}
+        metadata={"hnsw:space": "cosine", "index_version": index_version}
     )
     logger.info(f"Created collection '{CHROMA_COLLECTION}' (COSINE)")
 
@@ -73,5 +109,31 @@ def store_in_chroma(embedded_data: list[dict[str, Any]]) -> int:
 
     logger.info(f"Collection '{CHROMA_COLLECTION}' ready — {total_inserted} records total")
 
+    # Serving hydrates text/metadata by chunk id from this memory-mapped store
+    ChunkStore.write(
+        CHUNK_STORE_DIR,
+        ids=[item["metadata"]["chunk_id"] for item in embedded_data],
+        texts=[item["text"] for item in embedded_data],
+        metadatas=[item["metadata"] for item in embedded_data],
+        version=index_version,
+    )
+    logger.info(f"Wrote chunk store with {total_inserted} records to {CHUNK_STORE_DIR}")
+
+    # Reranker token ids per chunk, so serving only has to tokenize the query
+    from transformers import AutoTokenizer
+
+    TokenStore.write(
+        RERANK_TOKEN_DIR,
+        ids=[item["metadata"]["chunk_id"] for item in embedded_data],
+        texts=[item["text"] for item in embedded_data],
+        tokenizer=AutoTokenizer.from_pretrained(RERANKER_MODEL),
+        tokenizer_name=RERANKER_MODEL,
+        max_length=RERANKER_MAX_LENGTH,
+        version=index_version,
+    )
+    logger.info(f"Wrote reranker token ids for {total_inserted} chunks to {RERANK_TOKEN_DIR}")
+
+    _write_index_version(index_version, total_inserted)
+
     return total_inserted
 